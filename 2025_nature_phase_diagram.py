@@ -5,6 +5,8 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import Polygon
 from scipy.optimize import fsolve
 
+from figure_export import export_figure
+
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
@@ -182,9 +184,8 @@ ax.spines['bottom'].set_linewidth(2)
 ax.spines['left'].set_linewidth(2)
 
 plt.tight_layout()
-plt.savefig('phase_diagram_with_intersections.png', dpi=300)
-plt.savefig('phase_diagram_with_intersections.svg', dpi=300)
-plt.savefig('phase_diagram_with_intersections.pdf', dpi=300)
+export_figure(fig, ['phase_diagram_with_intersections.png', 'phase_diagram_with_intersections.svg',
+                    'phase_diagram_with_intersections.pdf'], raster_dpi=300, vector_dpi=300)
 plt.show()
 
 # 保存交点数据
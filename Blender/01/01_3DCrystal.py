@@ -1,13 +1,26 @@
 import bpy
+import json
 import math
+import os
+import sys
+import time
+import numpy as np  # Blender 自带 NumPy
+
+# crystal_geometry.py 与本脚本放在同一目录
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from crystal_geometry import lattice_metadata, lattice_origins, positions_metadata, unit_geometry
+from crystal_structures import (bond_segments, cylinders_mesh, element_spheres, find_bonds,
+                                read_structure, supercell)
 
 # ===== 清空场景 =====
-bpy.ops.object.select_all(action='SELECT')
-bpy.ops.object.delete(use_global=False)
+def clear_scene():
+    bpy.ops.object.select_all(action='SELECT')
+    bpy.ops.object.delete(use_global=False)
 
 # ===== 材质创建函数 =====
 def create_material(name, color):
-    mat = bpy.data.materials.new(name=name)
+    """同名材质已存在（例如打开缓存的 .blend）时只更新颜色"""
+    mat = bpy.data.materials.get(name) or bpy.data.materials.new(name=name)
     mat.diffuse_color = (*color, 1)  # RGBA
     return mat
 
@@ -16,8 +29,44 @@ mat_sphere = create_material("SphereMaterial", (1.0, 0.75, 0.0))  # 橙黄色
 # 圆柱体（连接棒）材质
 mat_cylinder = create_material("CylinderMaterial", (0.5, 0.85, 1.0))  # 淡蓝色
 
-# ===== 创建一个单元格（球 + 三根棒） =====
-def create_unit():
+# ===== 用 NumPy 数组批量创建网格 =====
+def mesh_from_arrays(name, verts, loops, sizes, material_index=None):
+    """用 foreach_set 一次写入顶点/面（不经过 bpy.ops，不触发场景更新）"""
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", np.asarray(verts, dtype=np.float32).ravel())
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set("vertex_index", np.asarray(loops, dtype=np.int32))
+    mesh.polygons.add(len(sizes))
+    loop_start = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int32)
+    mesh.polygons.foreach_set("loop_start", loop_start)
+    if bpy.app.version < (4, 0, 0):
+        # 4.0 起面的顶点数由 loop_start 推出，loop_total 为只读
+        mesh.polygons.foreach_set("loop_total", np.asarray(sizes, dtype=np.int32))
+    if material_index is not None:
+        mesh.polygons.foreach_set("material_index", np.asarray(material_index, dtype=np.int32))
+    mesh.update(calc_edges=True)
+    mesh.validate()
+    return mesh
+
+# ===== 创建一个单元格（球 + 最近邻连接棒） =====
+def create_unit(cell='sc', spacing=1.0):
+    """
+    用 NumPy 生成一个晶胞的球和棒并一次写入网格
+    cell: 'sc'、'bcc'、'fcc'、'hex'、'hcp'，或 (晶格矢量, 分数坐标基元)
+    简单立方时与 create_unit_ops 的结果相同
+    """
+    verts, loops, sizes, material_index = unit_geometry(cell, spacing)
+    mesh = mesh_from_arrays("CrystalUnit", verts, loops, sizes, material_index)
+    mesh.materials.append(mat_sphere)
+    mesh.materials.append(mat_cylinder)
+
+    unit = bpy.data.objects.new("CrystalUnit", mesh)
+    bpy.context.collection.objects.link(unit)
+    return unit
+
+# ===== 原始方式：用 bpy.ops 创建单元格（球 + 三根棒），保留用于对比 =====
+def create_unit_ops():
     # 球体
     bpy.ops.mesh.primitive_uv_sphere_add(segments=16, ring_count=8, radius=0.15, location=(0, 0, 0))
     sphere = bpy.context.active_object
@@ -50,56 +99,242 @@ def create_unit():
     return sphere
 
 # ===== 生成晶格 =====
-size = 5  # 晶格的点数（立方体边长有多少节点）
-spacing = 1.0  # 节点间距
-unit = create_unit()
-
-objects = []
-for x in range(size):
-    for y in range(size):
-        for z in range(size):
-            obj = unit.copy()
-            obj.location = (x * spacing, y * spacing, z * spacing)
-            bpy.context.collection.objects.link(obj)
-            objects.append(obj)
-
-# 删除原始单元模板
-bpy.data.objects.remove(unit, do_unlink=True)
-
-# ===== 计算模型中心点 =====
-min_x = min(obj.location.x for obj in objects)
-max_x = max(obj.location.x for obj in objects)
-min_y = min(obj.location.y for obj in objects)
-max_y = max(obj.location.y for obj in objects)
-min_z = min(obj.location.z for obj in objects)
-max_z = max(obj.location.z for obj in objects)
-
-center_x = (min_x + max_x) / 2
-center_y = (min_y + max_y) / 2
-center_z = (min_z + max_z) / 2
-max_dimension = max(max_x - min_x, max_y - min_y, max_z - min_z)
-
-# ===== 添加相机（自动对准模型中心） =====
-cam_distance = max_dimension * 2.5  # 相机距离
-bpy.ops.object.camera_add(location=(center_x + cam_distance, center_y - cam_distance, center_z + cam_distance / 2))
-camera = bpy.context.active_object
-bpy.context.scene.camera = camera
-
-# 让相机看向模型中心
-direction = (center_x - camera.location.x,
-             center_y - camera.location.y,
-             center_z - camera.location.z)
-rot_y = math.atan2(-direction[2], math.sqrt(direction[0]**2 + direction[1]**2))
-rot_z = math.atan2(direction[1], direction[0])
-camera.rotation_euler = (rot_y, 0, rot_z)
-
-# ===== 添加灯光 =====
-bpy.ops.object.light_add(type='AREA', location=(center_x, center_y, max_z + cam_distance))
-light = bpy.context.active_object
-light.data.energy = 3000
-light.data.size = max_dimension * 1.5
-
-# ===== 设置背景颜色 =====
-bpy.context.scene.world.color = (0.1, 0.15, 0.25)
-
-print("3D 晶格模型 + 自动对准相机 已完成！")
+def build_lattice_copies(unit, positions):
+    """原始方式：每个格点复制一个对象（对象数 = 格点数，大晶格时依赖图很慢）"""
+    objects = []
+    for location in positions.tolist():
+        obj = unit.copy()
+        obj.location = location
+        bpy.context.collection.objects.link(obj)
+        objects.append(obj)
+
+    # 删除原始单元模板
+    bpy.data.objects.remove(unit, do_unlink=True)
+    return objects
+
+def build_lattice_instanced(unit, positions):
+    """
+    实例化方式：所有格点作为一个网格的顶点，单元作为其子对象按顶点实例化
+    场景中只有两个对象，内存只与一个单元成正比
+    """
+    mesh = bpy.data.meshes.new("LatticePoints")
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set("co", positions.astype(np.float32).ravel())
+    mesh.update()
+
+    lattice = bpy.data.objects.new("Lattice", mesh)
+    bpy.context.collection.objects.link(lattice)
+    lattice.instance_type = 'VERTS'
+    # 点云本身不显示，只显示实例
+    lattice.show_instancer_for_viewport = False
+    lattice.show_instancer_for_render = False
+
+    # 模板位于原点，与原点处的实例重合
+    unit.location = (0, 0, 0)
+    unit.parent = lattice
+    return [lattice]
+
+def build_lattice(size, spacing, mode='instanced', cell='sc'):
+    """创建单元并按 mode（'instanced' 或 'copy'）铺满晶格，返回 (对象列表, 格点坐标, 耗时)"""
+    start = time.perf_counter()
+    positions = lattice_origins(size, spacing, cell)
+    unit = create_unit(cell, spacing)
+    if mode == 'copy':
+        objects = build_lattice_copies(unit, positions)
+    else:
+        objects = build_lattice_instanced(unit, positions)
+    # 计入依赖图更新时间
+    bpy.context.view_layer.update()
+    return objects, positions, time.perf_counter() - start
+
+def benchmark_build_modes(sizes=(5, 10, 20), modes=('copy', 'instanced')):
+    """比较逐个复制与顶点实例化的构建时间（每次都会清空场景）"""
+    results = {}
+    for size in sizes:
+        for build_mode in modes:
+            clear_scene()
+            _, _, elapsed = build_lattice(size, 1.0, build_mode)
+            results[(size, build_mode)] = elapsed
+            print(f"size={size:4d} ({size**3:8d} 个格点) {build_mode:>9}: {elapsed:8.2f} s")
+    clear_scene()
+    return results
+
+def benchmark_unit_builders(repeats=20):
+    """比较 bpy.ops 与 NumPy 批量写入创建单元的耗时"""
+    for builder in (create_unit_ops, create_unit):
+        clear_scene()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            builder()
+        bpy.context.view_layer.update()
+        elapsed = (time.perf_counter() - start) / repeats
+        print(f"{builder.__name__:>16}: 每个单元 {elapsed * 1000:.2f} ms")
+    clear_scene()
+
+# ===== 从 CIF / XYZ 文件构建真实结构 =====
+def build_structure(path, cutoff, repeats=(1, 1, 1), atom_radius=0.4, bond_radius=0.12):
+    """
+    读取结构文件，用网格分桶按 cutoff 找键（有晶胞时使用周期性边界）
+    每种元素一个按顶点实例化的球，所有键合成一个网格，返回元数据
+    """
+    start = time.perf_counter()
+    symbols, positions, lattice = read_structure(path)
+    if lattice is not None and tuple(repeats) != (1, 1, 1):
+        symbols, positions, lattice = supercell(symbols, positions, lattice, repeats)
+    i, j, shifts = find_bonds(positions, cutoff, lattice)
+    bond_time = time.perf_counter() - start
+
+    for element, color, atoms, sphere in element_spheres(symbols, atom_radius):
+        mesh = mesh_from_arrays(f"Atom_{element}", *sphere)
+        mesh.materials.append(create_material(f"Element_{element}", color))
+        unit = bpy.data.objects.new(f"Atom_{element}", mesh)
+        bpy.context.collection.objects.link(unit)
+        build_lattice_instanced(unit, positions[atoms])
+
+    if len(i):
+        mesh = mesh_from_arrays("Bonds", *cylinders_mesh(*bond_segments(positions, i, j, shifts, lattice),
+                                                         radius=bond_radius))
+        mesh.materials.append(mat_cylinder)
+        bpy.context.collection.objects.link(bpy.data.objects.new("Bonds", mesh))
+    bpy.context.view_layer.update()
+    print(f"{path}: {len(positions)} 个原子，{len(i)} 根键（找键 {bond_time:.2f} s，"
+          f"总计 {time.perf_counter() - start:.2f} s）")
+    return positions_metadata(positions)
+
+# ===== 相机和灯光 =====
+def setup_camera_and_light(metadata, distance_factor=2.5, camera_direction=(1, -1, 0.5)):
+    """
+    根据元数据（center、max、max_dimension）放置相机和面光源，不遍历场景对象
+    camera_direction: 相机相对中心的方向，按 max_dimension * distance_factor 缩放
+    """
+    center_x, center_y, center_z = np.asarray(metadata['center'], dtype=float).tolist()
+    max_z = float(metadata['max'][2])
+    max_dimension = metadata['max_dimension']
+
+    # ===== 添加相机（自动对准模型中心） =====
+    cam_distance = max_dimension * distance_factor  # 相机距离
+    offset = [component * cam_distance for component in camera_direction]
+    bpy.ops.object.camera_add(location=(center_x + offset[0], center_y + offset[1], center_z + offset[2]))
+    camera = bpy.context.active_object
+    bpy.context.scene.camera = camera
+
+    # 让相机看向模型中心
+    direction = (center_x - camera.location.x,
+                 center_y - camera.location.y,
+                 center_z - camera.location.z)
+    rot_y = math.atan2(-direction[2], math.sqrt(direction[0]**2 + direction[1]**2))
+    rot_z = math.atan2(direction[1], direction[0])
+    camera.rotation_euler = (rot_y, 0, rot_z)
+
+    # ===== 添加灯光 =====
+    bpy.ops.object.light_add(type='AREA', location=(center_x, center_y, max_z + cam_distance))
+    light = bpy.context.active_object
+    light.data.energy = 3000
+    light.data.size = max_dimension * 1.5
+
+    return camera, light
+
+# ===== 渲染 =====
+def render_to_file(filepath, engine='CYCLES', resolution=(1920, 1080), samples=64):
+    """用 CPU 引擎渲染当前相机画面：'CYCLES'（CPU 设备）或 'BLENDER_WORKBENCH'"""
+    scene = bpy.context.scene
+    scene.render.engine = engine
+    if engine == 'CYCLES':
+        scene.cycles.device = 'CPU'
+        scene.cycles.samples = samples
+    else:
+        # Workbench 默认不显示材质颜色
+        scene.display.shading.color_type = 'MATERIAL'
+    scene.render.resolution_x, scene.render.resolution_y = resolution
+    scene.render.resolution_percentage = 100
+    scene.render.filepath = filepath
+    bpy.ops.render.render(write_still=True)
+
+def camera_direction_from_angles(azimuth=-45.0, elevation=19.47):
+    """
+    方位角/仰角（度）转为相机方向，长度取 1.5
+    默认值即原先的 (1, -1, 0.5)，相机距离与之相同
+    """
+    azimuth, elevation = math.radians(azimuth), math.radians(elevation)
+    return (1.5 * math.cos(elevation) * math.cos(azimuth),
+            1.5 * math.cos(elevation) * math.sin(azimuth),
+            1.5 * math.sin(elevation))
+
+def build_scene(size, spacing, mode='instanced', cell='sc'):
+    """清空场景并构建晶格和背景（不含相机和灯光），返回元数据"""
+    clear_scene()
+    objects, positions, build_time = build_lattice(size, spacing, mode, cell)
+    print(f"晶格构建（{mode}，{len(positions)} 个格点）耗时 {build_time:.2f} s")
+    # ===== 设置背景颜色 =====
+    bpy.context.scene.world.color = (0.1, 0.15, 0.25)
+    # ===== 计算模型中心点（由 size/spacing 解析得到，无需遍历对象） =====
+    return lattice_metadata(size, spacing, cell)
+
+def render_jobs(jobs, reuse_scene=False, save_scene=None, build_only=False):
+    """
+    批量渲染同一结构（size/spacing/cell/mode 相同）的多组参数
+    场景只构建一次（reuse_scene 时直接使用已打开的 .blend），
+    每个任务只更新材质颜色、相机和灯光，然后渲染；build_only 时构建（并保存）场景后不渲染
+    """
+    first = jobs[0]
+    size, spacing = first.get('size', 5), first.get('spacing', 1.0)
+    mode, cell = first.get('mode', 'instanced'), first.get('cell', 'sc')
+    if reuse_scene:
+        metadata = lattice_metadata(size, spacing, cell)
+    else:
+        metadata = build_scene(size, spacing, mode, cell)
+        if save_scene:
+            bpy.ops.wm.save_as_mainfile(filepath=save_scene)
+    if build_only:
+        return
+
+    camera = light = None
+    for job in jobs:
+        start = time.perf_counter()
+        create_material("SphereMaterial", job.get('sphere_color', (1.0, 0.75, 0.0)))
+        create_material("CylinderMaterial", job.get('rod_color', (0.5, 0.85, 1.0)))
+        for obj in (camera, light):
+            if obj is not None:
+                bpy.data.objects.remove(obj, do_unlink=True)
+        direction = job.get('camera_direction') or camera_direction_from_angles(
+            job.get('azimuth', -45.0), job.get('elevation', 19.47))
+        camera, light = setup_camera_and_light(metadata, job.get('distance_factor', 2.5), direction)
+        render_to_file(job['output'], job.get('engine', 'CYCLES'),
+                       (job.get('resolution_x', 1920), job.get('resolution_y', 1080)),
+                       job.get('samples', 64))
+        print(f"{job['output']}: {time.perf_counter() - start:.2f} s")
+
+def parse_args(argv):
+    """Blender 把 '--' 之后的参数留给脚本"""
+    import argparse
+    argv = argv[argv.index('--') + 1:] if '--' in argv else []
+    parser = argparse.ArgumentParser(description="3D 晶格模型（批量渲染由 batch_render.py 调用）")
+    parser.add_argument('--jobs', help="同一结构的渲染任务列表（JSON）")
+    parser.add_argument('--reuse-scene', action='store_true', help="已打开缓存的 .blend，跳过构建")
+    parser.add_argument('--save-scene', help="构建完成后把场景保存为 .blend 缓存")
+    parser.add_argument('--build-only', action='store_true', help="只构建（并保存）场景，不渲染")
+    parser.add_argument('--structure', help="从 .cif / .xyz 文件读取结构，代替理想晶格")
+    parser.add_argument('--cutoff', type=float, default=3.0, help="成键距离上限（与文件坐标单位相同）")
+    parser.add_argument('--supercell', type=int, nargs=3, default=(1, 1, 1), metavar=('NA', 'NB', 'NC'))
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv)
+    if args.jobs:
+        with open(args.jobs, encoding='utf-8') as f:
+            render_jobs(json.load(f), args.reuse_scene, args.save_scene, args.build_only)
+    elif args.structure:
+        clear_scene()
+        metadata = build_structure(args.structure, args.cutoff, args.supercell)
+        camera, light = setup_camera_and_light(metadata)
+        bpy.context.scene.world.color = (0.1, 0.15, 0.25)
+    else:
+        size = 5  # 晶格的点数（立方体边长有多少节点）
+        spacing = 1.0  # 节点间距
+        mode = 'instanced'  # 'instanced'：顶点实例化；'copy'：逐个复制对象（原始方式）
+        cell = 'sc'  # 晶胞类型：'sc'、'bcc'、'fcc'、'hex'、'hcp'
+
+        metadata = build_scene(size, spacing, mode, cell)
+        camera, light = setup_camera_and_light(metadata)
+
+        print("3D 晶格模型 + 自动对准相机 已完成！")
@@ -0,0 +1,203 @@
+"""
+批量渲染晶格：读取 JSON/CSV 参数表，并行启动 `blender --background --python 01_3DCrystal.py`
+
+参数表每行一个渲染任务，可用的列：
+    size, spacing, cell, mode          结构参数（决定场景，相同的行共用一次构建）
+    sphere_color, rod_color            材质颜色，"#ffbf00" 或 "1.0 0.75 0.0"
+    azimuth, elevation, distance_factor  相机（也可直接给 camera_direction）
+    engine, samples, resolution_x, resolution_y, output
+结构参数相同的行共用一个场景：先由一个 Blender 进程构建并另存为 .blend 缓存（不渲染），
+然后所有任务按进程数分成若干批，各批并行打开缓存的场景，只改材质和相机。
+下次运行同一结构时直接打开缓存。
+
+用法：
+    python batch_render.py params.csv --output-dir renders --engine BLENDER_WORKBENCH
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import numbers
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCENE_SCRIPT = os.path.join(HERE, '01_3DCrystal.py')
+STRUCTURE_KEYS = ('size', 'spacing', 'cell', 'mode')
+STRUCTURE_DEFAULTS = {'size': 5, 'spacing': 1.0, 'cell': 'sc', 'mode': 'instanced'}
+COLOR_KEYS = ('sphere_color', 'rod_color', 'camera_direction')
+
+
+# ===== 读取参数表 =====
+def _parse_value(text):
+    """CSV 单元格：依次尝试 int、float，否则保留字符串"""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _parse_vector(value):
+    """'#rrggbb'、'r g b'、'r,g,b' 或列表 → 浮点列表"""
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('#'):
+            return [int(value[i:i + 2], 16) / 255 for i in (1, 3, 5)]
+        value = value.replace(',', ' ').split()
+    return [float(v) for v in value]
+
+
+def read_parameter_table(path):
+    """读取 .json（对象列表）或 .csv（表头为列名），空单元格视为未设置"""
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = [{key: _parse_value(value) for key, value in row.items() if value not in ('', None)}
+                    for row in csv.DictReader(f)]
+    for row in rows:
+        for key in COLOR_KEYS:
+            if key in row:
+                row[key] = _parse_vector(row[key])
+    return rows
+
+
+# ===== 按结构分组 =====
+def _normalize(value):
+    """数值统一为 float，CSV 的 1 与 JSON 的 1.0 得到相同的结构键"""
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def structure_key(row):
+    return tuple(_normalize(row.get(key, STRUCTURE_DEFAULTS[key])) for key in STRUCTURE_KEYS)
+
+
+def scene_cache_path(cache_dir, key):
+    """场景缓存按结构参数 + 构建脚本内容哈希命名，脚本改动后缓存自动失效"""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=16)
+    for source in (SCENE_SCRIPT, os.path.join(HERE, 'crystal_geometry.py')):
+        with open(source, 'rb') as f:
+            digest.update(f.read())
+    return os.path.join(cache_dir, f"scene_{digest.hexdigest()}.blend")
+
+
+def plan_jobs(rows, output_dir, engine='CYCLES'):
+    """补全输出路径和引擎，按结构参数分组，返回 {结构: [任务, ...]}"""
+    groups = {}
+    for index, row in enumerate(rows):
+        job = dict(row)
+        job.setdefault('engine', engine)
+        job['output'] = os.path.abspath(job.get('output') or
+                                        os.path.join(output_dir, f"crystal_{index:04d}.png"))
+        for key in STRUCTURE_KEYS:
+            job.setdefault(key, STRUCTURE_DEFAULTS[key])
+        groups.setdefault(structure_key(job), []).append(job)
+    return groups
+
+
+# ===== 启动 Blender =====
+def split_jobs(jobs, chunk_size):
+    """把一个结构组的任务切成每批最多 chunk_size 个"""
+    return [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+
+def run_group(blender, jobs, cache_dir, threads=1, use_cache=True, build_only=False):
+    """
+    一批任务 = 一个后台 Blender 进程；有缓存时打开 .blend 跳过构建，否则构建并另存
+    build_only 时只按 jobs[0] 的结构参数构建并保存场景，不渲染，返回的任务数为 0
+    """
+    key = structure_key(jobs[0])
+    os.makedirs(cache_dir, exist_ok=True)
+    blend = scene_cache_path(cache_dir, key)
+    jobs_file = blend[:-len('.blend')] + f"_{os.getpid()}_{id(jobs)}.json"
+    with open(jobs_file, 'w', encoding='utf-8') as f:
+        json.dump(jobs, f)
+
+    command = [blender, '--background']
+    script_args = ['--jobs', jobs_file]
+    if use_cache and os.path.exists(blend):
+        command.append(blend)
+        script_args.append('--reuse-scene')
+    elif use_cache:
+        script_args += ['--save-scene', blend]
+    if build_only:
+        script_args.append('--build-only')
+    command += ['--threads', str(threads), '--python', SCENE_SCRIPT, '--'] + script_args
+
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(command, capture_output=True, text=True)
+    finally:
+        os.remove(jobs_file)
+    if result.returncode != 0:
+        print(result.stdout[-2000:], result.stderr[-2000:])
+    return key, 0 if build_only else len(jobs), result.returncode, time.perf_counter() - start
+
+
+def batch_render(rows, output_dir, blender='blender', engine='CYCLES', workers=None,
+                 threads=1, cache_dir=None, use_cache=True):
+    """
+    并行渲染所有任务，进程数 × 每进程线程数不超过 CPU 核数
+    每个结构组切成约 总任务数 / workers 个一批，使同一结构的大量相机、材质变体也能占满所有进程：
+    第一阶段每个还没有 .blend 缓存的结构只构建并保存场景，第二阶段所有批次并行打开缓存渲染
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache_dir = os.path.abspath(cache_dir or os.path.join(output_dir, '.scene_cache'))
+    groups = plan_jobs(rows, output_dir, engine)
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads)
+    chunk_size = max(1, math.ceil(len(rows) / workers))
+    batches = {key: split_jobs(jobs, chunk_size) for key, jobs in groups.items()}
+
+    start = time.perf_counter()
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def run(phase, build_only=False):
+            futures = [pool.submit(run_group, blender, jobs, cache_dir, threads, use_cache, build_only)
+                       for jobs in phase]
+            for future in futures:
+                key, n_jobs, returncode, elapsed = future.result()
+                status = "完成" if returncode == 0 else f"失败（返回码 {returncode}）"
+                task = "场景构建" if build_only else f"{n_jobs} 张"
+                print(f"{dict(zip(STRUCTURE_KEYS, key))}: {task} {status}，{elapsed:.1f} s")
+                if returncode != 0 and key not in failed:
+                    failed.append(key)
+
+        # 没有缓存的结构先各构建一次（不渲染，其余核不必等一整批渲染完）；
+        # 不用缓存时每批自己构建，无需先后
+        building = [key for key in batches
+                    if use_cache and not os.path.exists(scene_cache_path(cache_dir, key))]
+        run([batches[key][0][:1] for key in building], build_only=True)
+        run([jobs for key, group in batches.items() if key not in failed for jobs in group])
+    elapsed = time.perf_counter() - start
+    print(f"共 {len(rows)} 张（{len(groups)} 个结构），{workers} 个进程，总耗时 {elapsed:.1f} s")
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="并行批量渲染晶格（Blender 后台模式）")
+    parser.add_argument('table', help="参数表（.json 或 .csv）")
+    parser.add_argument('--output-dir', default='renders')
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', 'blender'),
+                        help="Blender 可执行文件（也可用环境变量 BLENDER）")
+    parser.add_argument('--engine', default='CYCLES', choices=['CYCLES', 'BLENDER_WORKBENCH'],
+                        help="参数表未指定 engine 时使用的 CPU 渲染引擎")
+    parser.add_argument('--workers', type=int, default=None, help="并行 Blender 进程数（默认 核数 // threads）")
+    parser.add_argument('--threads', type=int, default=1, help="每个 Blender 进程的渲染线程数")
+    parser.add_argument('--cache-dir', default=None, help="场景 .blend 缓存目录")
+    parser.add_argument('--no-cache', action='store_true', help="不读写 .blend 缓存")
+    args = parser.parse_args()
+
+    failed = batch_render(read_parameter_table(args.table), args.output_dir, args.blender,
+                          args.engine, args.workers, args.threads, args.cache_dir,
+                          not args.no_cache)
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,190 @@
+"""
+晶体单元几何体的 NumPy 构建函数（不依赖 bpy，可在 Blender 外测试）
+
+网格统一表示为 (verts, loops, sizes)：
+    verts  (N, 3) 顶点坐标
+    loops  所有面的顶点索引依次拼接
+    sizes  每个面的顶点数
+这正是 Blender mesh.vertices / loops / polygons 的 foreach_set 所需的布局。
+"""
+
+import numpy as np
+
+# ===== 常见晶胞：晶格矢量（行）+ 分数坐标基元 =====
+_HEX = np.array([[1.0, 0.0, 0.0],
+                 [-0.5, np.sqrt(3) / 2, 0.0],
+                 [0.0, 0.0, 1.0]])
+
+UNIT_CELLS = {
+    'sc': (np.eye(3), [[0, 0, 0]]),
+    'bcc': (np.eye(3), [[0, 0, 0], [0.5, 0.5, 0.5]]),
+    'fcc': (np.eye(3), [[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]]),
+    'hex': (_HEX, [[0, 0, 0]]),
+    'hcp': (_HEX * [[1], [1], [np.sqrt(8 / 3)]], [[0, 0, 0], [1 / 3, 2 / 3, 0.5]]),
+}
+
+
+def get_unit_cell(cell):
+    """cell 可以是 UNIT_CELLS 中的名称，或 (晶格矢量, 分数坐标基元)"""
+    if isinstance(cell, str):
+        cell = UNIT_CELLS[cell]
+    lattice, basis = cell
+    return np.asarray(lattice, dtype=float), np.atleast_2d(np.asarray(basis, dtype=float))
+
+
+# ===== 基本体 =====
+def uv_sphere(radius, segments=16, rings=8):
+    """与 primitive_uv_sphere_add 拓扑相同的 UV 球：两极三角形 + 中间四边形"""
+    polar = np.linspace(0, np.pi, rings + 1)[1:-1]
+    azimuth = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    s, a = np.meshgrid(np.sin(polar), azimuth, indexing='ij')
+    ring_verts = np.stack([s * np.cos(a), s * np.sin(a),
+                           np.repeat(np.cos(polar)[:, None], segments, axis=1)], axis=-1)
+    verts = np.vstack([[0, 0, 1], ring_verts.reshape(-1, 3), [0, 0, -1]]) * radius
+
+    seg = np.arange(segments)
+    nxt = (seg + 1) % segments
+    bottom = len(verts) - 1
+    top_tris = np.stack([np.zeros(segments, int), 1 + seg, 1 + nxt], axis=1)
+    ring0 = 1 + segments * np.arange(rings - 2)[:, None]
+    quads = np.stack([ring0 + seg, ring0 + segments + seg,
+                      ring0 + segments + nxt, ring0 + nxt], axis=-1).reshape(-1, 4)
+    last = 1 + segments * (rings - 2)
+    bottom_tris = np.stack([last + nxt, last + seg, np.full(segments, bottom)], axis=1)
+
+    loops = np.concatenate([top_tris.ravel(), quads.ravel(), bottom_tris.ravel()])
+    sizes = np.concatenate([np.full(segments, 3), np.full(len(quads), 4), np.full(segments, 3)])
+    return verts, loops, sizes
+
+
+def cylinder(radius, depth, vertices=16, caps=True):
+    """与 primitive_cylinder_add 相同的圆柱：沿 z 轴、以原点为中心、两端为 n 边形"""
+    angle = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    circle = np.stack([radius * np.cos(angle), radius * np.sin(angle)], axis=1)
+    verts = np.vstack([np.column_stack([circle, np.full(vertices, -depth / 2)]),
+                       np.column_stack([circle, np.full(vertices, depth / 2)])])
+
+    seg = np.arange(vertices)
+    nxt = (seg + 1) % vertices
+    sides = np.stack([seg, nxt, vertices + nxt, vertices + seg], axis=1)
+    loops = [sides.ravel()]
+    sizes = [np.full(vertices, 4)]
+    if caps:
+        loops += [seg[::-1], vertices + seg]
+        sizes += [[vertices], [vertices]]
+    return verts, np.concatenate(loops), np.concatenate(sizes)
+
+
+def rotation_z_to(direction):
+    """把 +z 轴转到 direction 的旋转矩阵（Rodrigues 公式）"""
+    d = np.asarray(direction, dtype=float)
+    d = d / np.linalg.norm(d)
+    v = np.cross([0.0, 0.0, 1.0], d)
+    c = d[2]
+    if np.allclose(v, 0):
+        return np.eye(3) if c > 0 else np.diag([1.0, -1.0, -1.0])
+    k = np.array([[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]])
+    return np.eye(3) + k + k @ k / (1 + c)
+
+
+def merge_meshes(parts):
+    """合并多个 (verts, loops, sizes)，返回合并后的网格和每个面所属的部件序号"""
+    verts, loops, sizes, part_of_face = [], [], [], []
+    offset = 0
+    for index, (v, l, s) in enumerate(parts):
+        verts.append(v)
+        loops.append(np.asarray(l) + offset)
+        sizes.append(s)
+        part_of_face.append(np.full(len(s), index))
+        offset += len(v)
+    return (np.vstack(verts), np.concatenate(loops), np.concatenate(sizes),
+            np.concatenate(part_of_face))
+
+
+# ===== 晶胞单元 =====
+def unit_cell_bonds(lattice, basis, tolerance=1e-3):
+    """
+    晶胞内每个基元原子到最近邻的键，每根键只保留一次（平铺后不重复）
+    返回 (start, end) 两个 (n_bonds, 3) 笛卡尔坐标数组
+    """
+    frac_shifts = np.indices((3, 3, 3)).reshape(3, -1).T - 1
+    # 所有邻近晶胞中的原子，下标 k 对应 (shift = k // n_basis, 原子 j = k % n_basis)
+    candidates = (basis[None, :, :] + frac_shifts[:, None, :]).reshape(-1, 3) @ lattice
+    starts, ends = [], []
+    for i, origin in enumerate(basis @ lattice):
+        offsets = candidates - origin
+        distance = np.linalg.norm(offsets, axis=1)
+        nearest = distance[distance > tolerance].min()
+        for k in np.flatnonzero(np.abs(distance - nearest) <= tolerance * max(nearest, 1)):
+            shift, j = frac_shifts[k // len(basis)], k % len(basis)
+            # 同一根键也会以 (j, -shift) 出现，只保留字典序较大的一方
+            if tuple(shift) + (j,) > (0, 0, 0, i):
+                starts.append(origin)
+                ends.append(candidates[k])
+    return np.array(starts).reshape(-1, 3), np.array(ends).reshape(-1, 3)
+
+
+def unit_geometry(cell='sc', spacing=1.0, sphere_radius=0.15, rod_radius=0.05,
+                  sphere_segments=16, sphere_rings=8, rod_vertices=16):
+    """
+    一个晶胞的原子球 + 最近邻连接棒
+
+    返回 (verts, loops, sizes, material_index)，material_index 为 0（球）或 1（棒）。
+    简单立方时与原先 “球 + 沿 +x/+y/+z 三根棒” 的单元完全一致。
+    """
+    lattice, basis = get_unit_cell(cell)
+    lattice = lattice * spacing
+    sphere = uv_sphere(sphere_radius, sphere_segments, sphere_rings)
+
+    parts, materials = [], []
+    for position in basis @ lattice:
+        parts.append((sphere[0] + position, sphere[1], sphere[2]))
+        materials.append(0)
+    for start, end in zip(*unit_cell_bonds(lattice, basis)):
+        bond = end - start
+        rod = cylinder(rod_radius, np.linalg.norm(bond), rod_vertices)
+        rod_verts = rod[0] @ rotation_z_to(bond).T + (start + end) / 2
+        parts.append((rod_verts, rod[1], rod[2]))
+        materials.append(1)
+
+    verts, loops, sizes, part_of_face = merge_meshes(parts)
+    return verts, loops, sizes, np.asarray(materials)[part_of_face]
+
+
+def lattice_origins(size, spacing=1.0, cell='sc'):
+    """size**3 个晶胞的原点坐标，顺序与 x/y/z 三重循环一致"""
+    lattice, _ = get_unit_cell(cell)
+    grid = np.indices((size, size, size)).reshape(3, -1).T
+    return grid @ lattice * spacing
+
+
+# ===== 晶格元数据 =====
+def bounds_metadata(lo, hi, count):
+    """由包围盒生成元数据字典：min/max/center/extent/max_dimension/count"""
+    lo = np.asarray(lo, dtype=float)
+    hi = np.asarray(hi, dtype=float)
+    return {
+        'min': lo,
+        'max': hi,
+        'center': (lo + hi) / 2,
+        'extent': hi - lo,
+        'max_dimension': float((hi - lo).max()),
+        'count': int(count),
+    }
+
+
+def lattice_metadata(size, spacing=1.0, cell='sc'):
+    """
+    解析计算 size**3 个晶胞中所有原子位置的包围盒，不生成坐标数组
+    平行六面体网格的包围盒由 8 个角点决定，再加上基元原子的偏移
+    """
+    lattice, basis = get_unit_cell(cell)
+    corners = np.indices((2, 2, 2)).reshape(3, -1).T * (size - 1) @ lattice
+    sites = (corners[:, None, :] + (basis @ lattice)[None, :, :]).reshape(-1, 3) * spacing
+    return bounds_metadata(sites.min(axis=0), sites.max(axis=0), size**3 * len(basis))
+
+
+def positions_metadata(positions):
+    """任意坐标数组 (N, 3) 的元数据，一次 NumPy 归约"""
+    positions = np.asarray(positions, dtype=float)
+    return bounds_metadata(positions.min(axis=0), positions.max(axis=0), len(positions))
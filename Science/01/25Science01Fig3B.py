@@ -2,6 +2,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 
+from figure_export import export_figure
+
 # -----------------------------
 # Example synthetic data
 # Replace with your real experimental data
@@ -80,6 +82,5 @@ ax.legend(
 
 # Tight layout for publication
 plt.tight_layout()
-plt.savefig("25Science01Fig3B.png", dpi=300)
-plt.savefig("25Science01Fig3B.pdf", dpi=300)
+export_figure(plt.gcf(), ["25Science01Fig3B.png", "25Science01Fig3B.pdf"], raster_dpi=300, vector_dpi=300)
 plt.show()
@@ -3,6 +3,8 @@ import numpy as np
 
 import matplotlib as mpl
 
+from figure_export import export_figure
+
 
 mpl.rcParams.update({
     'font.size': 14,
@@ -78,6 +80,5 @@ legend_elements = [Patch(facecolor=color, edgecolor='black', label=grp) for grp,
 ax.legend(handles=legend_elements, title='', loc='upper right', frameon=False)
 
 plt.tight_layout()
-plt.savefig("25Science01Fig5A.png", dpi=300)
-plt.savefig("25Science01Fig5A.pdf", dpi=300)
+export_figure(plt.gcf(), ["25Science01Fig5A.png", "25Science01Fig5A.pdf"], raster_dpi=300, vector_dpi=300)
 plt.show()
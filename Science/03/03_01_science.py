@@ -1,10 +1,16 @@
 import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+import matplotlib.colors as mcolors
+from matplotlib.collections import LineCollection, PolyCollection
 from Bio import Phylo
 from Bio.Phylo import BaseTree
 import numpy as np
+import os
+import re
+from array import array
 from io import StringIO
 
+from figure_export import export_figure
+
 # Create a sample Newick tree string that matches the structure in your image
 # You should replace this with your actual phylogenetic tree data
 newick_tree = """
@@ -20,86 +26,494 @@ newick_tree = """
     ((G5:0.1,G6:0.1):0.09,(G7:0.1,G8:0.1):0.09):0.09):0.07):0.08):0.18);
 """
 
+class NodeTable:
+    """Flat, array-backed node table of a phylogenetic tree.
+
+    Nodes are stored in preorder: node 0 is the root and every parent comes
+    before its children, so a forward sweep visits parents first and a
+    backward sweep visits children first. Missing branch lengths are NaN.
+    """
+
+    __slots__ = ('names', 'parent', 'branch_length', 'is_terminal',
+                 'child_start', 'child_index', 'depth', 'x', 'y',
+                 'subtree_size', 'clades')
+
+    def __init__(self, names, parent, branch_length, clades=None):
+        self.names = list(names)
+        self.parent = np.asarray(parent, dtype=np.int64)
+        self.branch_length = np.asarray(branch_length, dtype=float)
+        self.is_terminal = np.ones(len(self.parent), dtype=bool)
+        self.is_terminal[self.parent[1:]] = False
+        # Filled in by layout_node_table
+        self.child_start = None
+        self.child_index = None
+        self.depth = None
+        self.x = None
+        self.y = None
+        self.subtree_size = None
+        # Original Bio.Phylo clades, when the table was built from a tree
+        self.clades = clades
+
+    def __len__(self):
+        return len(self.parent)
+
+    @property
+    def n_terminals(self):
+        return int(self.is_terminal.sum())
+
+    def children(self, index):
+        """Indices of the children of a node, left to right"""
+        return self.child_index[self.child_start[index]:self.child_start[index + 1]]
+
+
+def layout_node_table(table):
+    """Compute depth, x and y for every node of a NodeTable in place
+
+    x is the summed branch length from the root and y is the terminal rank
+    for leaves or the mean of the children's y for internal nodes, exactly
+    as calculate_tree_layout has always defined them.
+    """
+    n = len(table)
+    parent = table.parent.tolist()
+    branch_length = np.nan_to_num(table.branch_length, nan=0.0).tolist()
+    terminal = table.is_terminal.tolist()
+
+    # Children of each node in left-to-right order (CSR layout)
+    table.child_index = np.argsort(table.parent[1:], kind='stable') + 1
+    table.child_start = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(table.parent[1:], minlength=n),
+              out=table.child_start[1:])
+    child_index = table.child_index.tolist()
+    child_start = table.child_start.tolist()
+
+    # Forward sweep: parents are always laid out before their children
+    x = [0.0] * n
+    depth = [0] * n
+    y = [0.0] * n
+    rank = 0
+    for i in range(n):
+        if i:
+            p = parent[i]
+            x[i] = x[p] + branch_length[i]
+            depth[i] = depth[p] + 1
+        if terminal[i]:
+            y[i] = float(rank)
+            rank += 1
+
+    # Backward sweep: children are always finished before their parent
+    size = [1] * n
+    for i in range(n - 1, -1, -1):
+        if terminal[i]:
+            continue
+        kids = child_index[child_start[i]:child_start[i + 1]]
+        if len(kids) == 1:
+            y[i] = y[kids[0]]
+        elif len(kids) == 2:
+            y[i] = (y[kids[0]] + y[kids[1]]) / 2
+        else:
+            # np.mean keeps polytomies bit-identical to the original layout
+            y[i] = float(np.mean([y[k] for k in kids]))
+        for k in kids:
+            size[i] += size[k]
+
+    table.x = np.array(x)
+    table.y = np.array(y)
+    table.depth = np.array(depth, dtype=np.int64)
+    table.subtree_size = np.array(size, dtype=np.int64)
+    return table
+
+
+def build_node_table(tree):
+    """Flatten a Bio.Phylo tree into a laid-out NodeTable in one traversal"""
+    names = []
+    parent = []
+    branch_length = []
+    clades = []
+
+    stack = [(tree.root, -1)]
+    while stack:
+        clade, parent_index = stack.pop()
+        index = len(clades)
+        clades.append(clade)
+        names.append(clade.name)
+        parent.append(parent_index)
+        branch_length.append(np.nan if clade.branch_length is None
+                             else clade.branch_length)
+        # Push children right-to-left so they are visited left-to-right
+        stack.extend((child, index) for child in reversed(clade.clades))
+
+    return layout_node_table(NodeTable(names, parent, branch_length, clades))
+
+
+# Newick tokens: [comments], 'quoted labels', punctuation, bare labels/numbers
+_NEWICK_TOKEN = re.compile(r"""\s*(?:
+    (\[[^\]]*\])
+  | ('(?:[^']|'')*')
+  | ([(),;:])
+  | ([^\s(),;:\[\]']+)
+)""", re.VERBOSE)
+
+def _iter_newick_tokens(handle, chunk_size=1 << 20):
+    """Yield Newick tokens from a text handle, reading it chunk by chunk"""
+    buffer = ''
+    eof = False
+    while not eof:
+        chunk = handle.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        pos = 0
+        while True:
+            match = _NEWICK_TOKEN.match(buffer, pos)
+            # A token touching the end of the buffer may continue in the next chunk
+            if match is None or (not eof and match.end() >= len(buffer) - 1):
+                break
+            pos = match.end()
+            comment, quoted, punct, bare = match.groups()
+            if comment is None:
+                yield quoted or punct or bare
+        buffer = buffer[pos:]
+    if buffer.strip():
+        raise ValueError(f"Unparseable Newick text near: {buffer[:40]!r}")
+
+def iter_newick_tables(tree_file_path, chunk_size=1 << 20):
+    """
+    Stream a Newick file and yield one laid-out NodeTable per tree
+
+    The text is tokenized incrementally, so only the current tree is held in
+    memory, stored as compact arrays (name, branch length, parent) rather than
+    Bio.Phylo Clade objects. Names follow Bio.Phylo: quotes are stripped and
+    numeric internal labels are treated as support values, not names.
+    """
+    names = []
+    parent = array('q')
+    branch_length = array('d')
+    stack = []            # open internal nodes
+    current = -1          # node that labels and branch lengths apply to
+    expect_node = True    # next label starts a new leaf
+    in_length = False     # next token is a branch length
+
+    def add_node(name=None):
+        parent.append(stack[-1] if stack else -1)
+        names.append(name)
+        branch_length.append(np.nan)
+        return len(parent) - 1
+
+    with open(tree_file_path) as handle:
+        for token in _iter_newick_tokens(handle, chunk_size):
+            if in_length:
+                branch_length[current] = float(token)
+                in_length = False
+            elif token == '(':
+                current = add_node()
+                stack.append(current)
+                expect_node = True
+            elif token in ',);:':
+                # Unnamed leaves such as "(,)" or "(:0.1,B)"
+                if expect_node and (stack or token != ';'):
+                    current = add_node()
+                    expect_node = False
+                if token == ',':
+                    expect_node = True
+                elif token == ')':
+                    current = stack.pop()
+                elif token == ':':
+                    in_length = True
+                elif parent:
+                    yield layout_node_table(NodeTable(
+                        names, np.frombuffer(parent, dtype=np.int64),
+                        np.frombuffer(branch_length, dtype=float)))
+                    names, parent, branch_length = [], array('q'), array('d')
+                    current, expect_node = -1, True
+            elif expect_node:
+                current = add_node(token[1:-1] if token[0] == "'" else token)
+                expect_node = False
+            elif token[0] == "'":
+                names[current] = token[1:-1]
+            else:
+                try:
+                    float(token)
+                except ValueError:
+                    names[current] = token
+
+    if stack:
+        raise ValueError("Unbalanced parentheses in Newick file")
+    if parent:
+        # Tolerate a missing trailing semicolon
+        yield layout_node_table(NodeTable(
+            names, np.frombuffer(parent, dtype=np.int64),
+            np.frombuffer(branch_length, dtype=float)))
+
+def read_newick_table(tree_file_path, chunk_size=1 << 20):
+    """Read the first tree of a Newick file into a laid-out NodeTable"""
+    for table in iter_newick_tables(tree_file_path, chunk_size):
+        return table
+    raise ValueError(f"No tree found in {tree_file_path}")
+
 def calculate_tree_layout(tree):
     """Calculate x,y coordinates for all nodes in the tree"""
-    # Get all terminals and calculate their y-positions
-    terminals = tree.get_terminals()
+    table = build_node_table(tree)
+
+    # Keep the coordinates on the clades for code that reads them there
+    for clade, x, y in zip(table.clades, table.x.tolist(), table.y.tolist()):
+        clade.x_coord = x
+        clade.y_coord = y
+    tree.node_table = table
+
+    return tree
+
+class PrefixIndex:
+    """
+    Precompiled color_groups lookup: a trie over the group keys
+
+    A name belongs to the first key (in dict order) that it starts with,
+    the same rule as the original per-clade loop, but each lookup walks the
+    name once instead of testing every group.
+    """
+
+    def __init__(self, color_groups):
+        self.keys = list(color_groups)
+        self.colors = [color_groups[key] for key in self.keys]
+        self._trie = {}
+        for group_id, key in enumerate(self.keys):
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+            # The None slot marks the end of a key
+            node[None] = group_id
+
+    def lookup(self, name):
+        """Group ID for a single name, or -1 when no key matches"""
+        if not name or not self.keys:
+            return -1
+        node = self._trie
+        best = node.get(None, -1)
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            group_id = node.get(None)
+            if group_id is not None and (best < 0 or group_id < best):
+                best = group_id
+        return best
+
+    def assign(self, names):
+        """Group IDs for a sequence of names as an int array"""
+        return np.fromiter((self.lookup(name) for name in names),
+                           dtype=np.int64, count=len(names))
+
+    def rgba(self, default='black'):
+        """RGBA per group ID; the extra last row (ID -1) is the default color"""
+        return mcolors.to_rgba_array(self.colors + [default])
+
+def contiguous_runs(values):
+    """Return (start, end, value) arrays of runs of equal values, ends inclusive"""
+    values = np.asarray(values)
+    if len(values) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, values[:0]
+    boundaries = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(values)])) - 1
+    return starts, ends, values[starts]
+
+def terminal_group_ids(table, color_groups):
+    """Group ID for every terminal of a NodeTable, in terminal (y) order"""
+    terminals = np.flatnonzero(table.is_terminal)
+    names = [table.names[i] for i in terminals.tolist()]
+    return PrefixIndex(color_groups).assign(names)
+
+def draw_group_bars(table, ax, color_groups, bar_start_x, bar_width, alpha=0.8,
+                    pixel_rows=None):
+    """
+    Draw the colored side bars as one PolyCollection
+
+    Terminals are grouped by color and every contiguous run of one color
+    becomes a single rectangle; terminals without a group get no bar. With
+    pixel_rows set, bars are rasterized once they outnumber the pixel rows.
+    """
+    group_ids = terminal_group_ids(table, color_groups)
     
-    # Assign y-coordinates to terminals (evenly spaced)
-    for i, terminal in enumerate(terminals):
-        terminal.y_coord = float(i)
+    # Groups sharing a color merge into one run; ID -1 (no group) gets no bar
+    unique_rgba, color_of_group = np.unique(PrefixIndex(color_groups).rgba()[:-1],
+                                            axis=0, return_inverse=True)
+    color_of_group = np.append(color_of_group.ravel(), -1)
+    starts, ends, run_colors = contiguous_runs(color_of_group[group_ids])
+    keep = run_colors >= 0
+    starts, ends, run_colors = starts[keep], ends[keep], run_colors[keep]
     
-    # Calculate x-coordinates based on distance from root
-    for clade in tree.find_clades():
-        clade.x_coord = tree.distance(tree.root, clade)
+    # Terminal y equals its rank, so runs map straight to bar extents
+    y_min = starts - 0.4
+    y_max = ends + 0.4
+    verts = np.empty((len(starts), 4, 2))
+    verts[:, [0, 3], 0] = bar_start_x
+    verts[:, [1, 2], 0] = bar_start_x + bar_width
+    verts[:, [0, 1], 1] = y_min[:, None]
+    verts[:, [2, 3], 1] = y_max[:, None]
     
-    # Calculate y-coordinates for internal nodes (average of children)
-    for clade in tree.get_nonterminals(order='postorder'):
-        if clade.clades:
-            clade.y_coord = np.mean([child.y_coord for child in clade.clades])
+    bars = PolyCollection(verts, facecolors=unique_rgba[run_colors],
+                          edgecolors='none', alpha=alpha)
+    if pixel_rows is not None and len(verts) > pixel_rows:
+        bars.set_rasterized(True)
+    ax.add_collection(bars)
+    return bars
+
+def branch_segments(table):
+    """Return (horizontal, vertical) branch segments of a laid-out NodeTable
+
+    horizontal[k] is the branch of node k + 1 drawn from its parent's x, and
+    vertical holds one connector per internal node spanning its children.
+    """
+    x, y = table.x, table.y
+    child = np.arange(1, len(table))
+    parent = table.parent[1:]
+
+    horizontal = np.empty((len(child), 2, 2))
+    horizontal[:, 0, 0] = x[parent]
+    horizontal[:, 1, 0] = x[child]
+    horizontal[:, :, 1] = y[child, None]
+
+    # The union of every parent->child connector is one line per parent
+    y_low = y.copy()
+    y_high = y.copy()
+    np.minimum.at(y_low, parent, y[child])
+    np.maximum.at(y_high, parent, y[child])
+    internal = np.flatnonzero(~table.is_terminal)
+    vertical = np.empty((len(internal), 2, 2))
+    vertical[:, :, 0] = x[internal, None]
+    vertical[:, 0, 1] = y_low[internal]
+    vertical[:, 1, 1] = y_high[internal]
+
+    return horizontal, vertical
+
+def axes_pixel_rows(ax, dpi):
+    """Number of pixel rows the axes spans when the figure is saved at dpi"""
+    return ax.get_position().height * ax.figure.get_figheight() * dpi
+
+def collapse_node_table(table, pixel_rows):
+    """
+    Level-of-detail pass: find subtrees whose leaves share one pixel row
+
+    Assumes the terminals fill the y-range -0.5 .. n - 0.5 over pixel_rows
+    rows. Returns (hidden, collapsed) masks: hidden nodes are not drawn and
+    collapsed internal nodes are drawn as a wedge in place of their subtree.
+    """
+    leaves_per_row = table.n_terminals / pixel_rows
     
-    # Set root coordinates
-    if hasattr(tree.root, 'clades') and tree.root.clades:
-        tree.root.y_coord = np.mean([child.y_coord for child in tree.root.clades])
-    tree.root.x_coord = 0.0
+    # Preorder subtrees are contiguous, and so are their leaves
+    leaf_rank = np.concatenate(([0], np.cumsum(table.is_terminal)))
+    nodes = np.arange(len(table))
+    first_leaf = leaf_rank[nodes]
+    last_leaf = leaf_rank[nodes + table.subtree_size] - 1
+    single_row = (np.floor((first_leaf + 0.5) / leaves_per_row)
+                  == np.floor((last_leaf + 0.5) / leaves_per_row))
     
-    return tree
+    # A child's leaves lie within its parent's, so one row propagates down
+    hidden = np.zeros(len(table), dtype=bool)
+    hidden[1:] = single_row[table.parent[1:]]
+    collapsed = single_row & ~hidden & ~table.is_terminal
+    return hidden, collapsed
 
-def draw_tree_custom(tree, ax, color_groups=None):
-    """Custom tree drawing function with full control"""
+def draw_node_table(table, ax, color_groups=None, pixel_rows=None):
+    """
+    Draw a laid-out NodeTable as two LineCollections (horizontal, vertical)
+
+    With pixel_rows set (see axes_pixel_rows), subtrees whose leaves fall
+    within one pixel row are drawn as a single wedge, and any collection that
+    still has more elements than a few per row is rasterized, so vector
+    output stays bounded whatever the number of leaves.
+    """
     
     if color_groups is None:
         color_groups = {}
     
+    horizontal, vertical = branch_segments(table)
+    terminal = table.is_terminal[1:]
+    
+    # Terminal branches take their group color, internal branches stay black
+    index = PrefixIndex(color_groups)
+    group_ids = terminal_group_ids(table, color_groups)
+    colors = np.tile(mcolors.to_rgba('black'), (len(horizontal), 1))
+    # A lone root is a terminal without a branch of its own
+    colors[terminal] = index.rgba(default='black')[group_ids[int(table.is_terminal[0]):]]
+    linewidths = np.where(terminal, 1.5, 1.0)
+    
+    wedges = None
+    if pixel_rows is not None:
+        hidden, collapsed = collapse_node_table(table, pixel_rows)
+        drawn = ~hidden[1:]
+        horizontal, colors, linewidths = horizontal[drawn], colors[drawn], linewidths[drawn]
+        internal = np.flatnonzero(~table.is_terminal)
+        vertical = vertical[~(hidden | collapsed)[internal]]
+        wedges = collapsed_wedges(table, np.flatnonzero(collapsed), group_ids, index)
+    
+    lines = [LineCollection(vertical, colors='black', linewidths=1.0,
+                            capstyle='round'),
+             LineCollection(horizontal, colors=colors,
+                            linewidths=linewidths, capstyle='round')]
+    if wedges is not None:
+        lines.append(wedges)
+    for collection in lines:
+        if pixel_rows is not None and len(collection.get_paths()) > 4 * pixel_rows:
+            collection.set_rasterized(True)
+        ax.add_collection(collection)
+    ax.autoscale_view()
+    
+    return table
+
+def collapsed_wedges(table, collapsed, group_ids, index):
+    """
+    Build one triangle per collapsed subtree as a PolyCollection
+
+    Each wedge runs from the subtree root out to its deepest leaf and spans
+    its first to last leaf. It takes the group color when all its leaves
+    share one group and is gray otherwise.
+    """
+    ends = collapsed + table.subtree_size[collapsed]
+    if len(collapsed):
+        # Max x over each contiguous preorder range [start, end)
+        bounds = np.column_stack([collapsed, ends]).ravel()
+        x_far = np.maximum.reduceat(np.append(table.x, 0.0), bounds)[::2]
+    else:
+        x_far = np.empty(0)
+    
+    leaf_rank = np.concatenate(([0], np.cumsum(table.is_terminal)))
+    first_leaf = leaf_rank[collapsed]
+    last_leaf = leaf_rank[ends] - 1
+    
+    # Leaves share a group when no group change happens between first and last
+    changes = np.concatenate(([0], np.cumsum(group_ids[1:] != group_ids[:-1])))
+    uniform = changes[last_leaf] == changes[first_leaf]
+    palette = index.rgba(default='0.6')
+    facecolors = np.where(uniform[:, None], palette[group_ids[first_leaf]],
+                          mcolors.to_rgba('0.6'))
+    
+    verts = np.empty((len(collapsed), 3, 2))
+    verts[:, 0, 0] = table.x[collapsed]
+    verts[:, 0, 1] = table.y[collapsed]
+    verts[:, 1:, 0] = x_far[:, None]
+    verts[:, 1, 1] = first_leaf
+    verts[:, 2, 1] = last_leaf
+    return PolyCollection(verts, facecolors=facecolors, edgecolors='black',
+                          linewidths=0.5)
+
+def draw_tree_custom(tree, ax, color_groups=None, pixel_rows=None):
+    """Custom tree drawing function with full control"""
+    
     # Calculate layout
     tree = calculate_tree_layout(tree)
     
-    def get_color(clade):
-        """Get color for a clade based on its name"""
-        if clade.name and color_groups:
-            # Try to match by first letter or full name
-            for key, color in color_groups.items():
-                if clade.name.startswith(key) or clade.name == key:
-                    return color
-        return 'black'
-    
-    # Draw all branches
-    for clade in tree.find_clades():
-        if clade == tree.root:
-            continue
-            
-        # Find parent
-        parent = None
-        for potential_parent in tree.find_clades():
-            if clade in potential_parent.clades:
-                parent = potential_parent
-                break
-        
-        if parent is None:
-            continue
-        
-        # Determine color and line width
-        if clade.is_terminal():
-            color = get_color(clade)
-            linewidth = 1.5
-        else:
-            color = 'black'
-            linewidth = 1.0
-        
-        # Draw horizontal line (branch)
-        ax.plot([parent.x_coord, clade.x_coord], 
-                [clade.y_coord, clade.y_coord], 
-                color=color, linewidth=linewidth, solid_capstyle='round')
-        
-        # Draw vertical line connecting to parent
-        ax.plot([parent.x_coord, parent.x_coord], 
-                [parent.y_coord, clade.y_coord], 
-                color='black', linewidth=1.0, solid_capstyle='round')
+    # Draw all branches from the flat node table in two collections
+    draw_node_table(tree.node_table, ax, color_groups, pixel_rows)
     
     return tree
 
-def create_phylogenetic_tree_figure():
-    """Create a publication-ready phylogenetic tree figure"""
+def create_phylogenetic_tree_figure(level_of_detail=False, dpi=300):
+    """
+    Create a publication-ready phylogenetic tree figure
+    
+    level_of_detail: bool - collapse subtrees narrower than one pixel row
+                     at the given output dpi into wedges
+    """
     
     # Parse the Newick tree
     tree = Phylo.read(StringIO(newick_tree), "newick")
@@ -119,37 +533,21 @@ def create_phylogenetic_tree_figure():
     }
     
     # Draw the tree
-    tree = draw_tree_custom(tree, ax, color_groups)
+    pixel_rows = axes_pixel_rows(ax, dpi) if level_of_detail else None
+    tree = draw_tree_custom(tree, ax, color_groups, pixel_rows)
     
     # Get tree dimensions
-    terminals = tree.get_terminals()
-    max_x = max(clade.x_coord for clade in tree.find_clades())
-    max_y = len(terminals) - 1
+    table = tree.node_table
+    max_x = table.x.max()
+    max_y = table.n_terminals - 1
     
     # Add colored bars on the right side
     bar_width = max_x * 0.03
     bar_start_x = max_x * 1.05
     
-    # Group terminals by their colors and create colored bars
-    color_regions = {}
-    for terminal in terminals:
-        color_key = terminal.name[0] if terminal.name else 'unknown'
-        color = color_groups.get(color_key, 'black')
-        
-        if color not in color_regions:
-            color_regions[color] = []
-        color_regions[color].append(terminal.y_coord)
-    
-    # Draw colored rectangles
-    for color, y_positions in color_regions.items():
-        if len(y_positions) > 0 and color != 'black':
-            y_min = min(y_positions) - 0.4
-            y_max = max(y_positions) + 0.4
-            height = y_max - y_min
-            
-            rect = mpatches.Rectangle((bar_start_x, y_min), bar_width, height,
-                                    facecolor=color, edgecolor='none', alpha=0.8)
-            ax.add_patch(rect)
+    # One rectangle per contiguous run of same-colored terminals
+    draw_group_bars(table, ax, color_groups, bar_start_x, bar_width,
+                    pixel_rows=pixel_rows)
     
     # Set axis limits and appearance
     ax.set_xlim(-max_x * 0.02, max_x * 1.15)
@@ -170,7 +568,8 @@ def create_phylogenetic_tree_figure():
     
     return fig, ax, tree
 
-def load_and_visualize_tree(tree_file_path, file_format='newick', color_groups=None):
+def load_and_visualize_tree(tree_file_path, file_format='newick', color_groups=None,
+                            streaming=False, level_of_detail=False, dpi=300):
     """
     Load a phylogenetic tree from file and create visualization
     
@@ -178,11 +577,22 @@ def load_and_visualize_tree(tree_file_path, file_format='newick', color_groups=N
     tree_file_path: str - path to your tree file
     file_format: str - format of tree file ('newick', 'nexus', 'phyloxml', etc.)
     color_groups: dict - mapping of taxa prefixes to colors
+    streaming: bool - parse Newick incrementally into a compact NodeTable
+               instead of Bio.Phylo clades; the NodeTable is returned in
+               place of the tree
+    level_of_detail: bool - collapse subtrees narrower than one pixel row
+                     at the given output dpi into wedges
+    dpi: int - resolution the figure will be saved at
     """
     
     try:
         # Load tree from file
-        tree = Phylo.read(tree_file_path, file_format)
+        if streaming:
+            if file_format != 'newick':
+                raise ValueError("streaming=True only supports Newick files")
+            tree = read_newick_table(tree_file_path)
+        else:
+            tree = Phylo.read(tree_file_path, file_format)
         
         # Create figure
         fig, ax = plt.subplots(1, 1, figsize=(10, 12))
@@ -199,12 +609,16 @@ def load_and_visualize_tree(tree_file_path, file_format='newick', color_groups=N
             }
         
         # Draw the tree
-        tree = draw_tree_custom(tree, ax, color_groups)
+        pixel_rows = axes_pixel_rows(ax, dpi) if level_of_detail else None
+        if streaming:
+            table = draw_node_table(tree, ax, color_groups, pixel_rows)
+        else:
+            tree = draw_tree_custom(tree, ax, color_groups, pixel_rows)
+            table = tree.node_table
         
         # Customize appearance
-        terminals = tree.get_terminals()
-        max_x = max(clade.x_coord for clade in tree.find_clades())
-        max_y = len(terminals) - 1
+        max_x = table.x.max()
+        max_y = table.n_terminals - 1
         
         ax.set_xlim(-max_x * 0.02, max_x * 1.1)
         ax.set_ylim(-0.5, max_y + 0.5)
@@ -221,6 +635,28 @@ def load_and_visualize_tree(tree_file_path, file_format='newick', color_groups=N
         print("Make sure the file exists and is in the correct format.")
         return None, None, None
 
+def benchmark_tree_loaders(tree_file_path):
+    """Report parse+layout time and peak memory of Bio.Phylo vs. streaming loader"""
+    import time
+    import tracemalloc
+    
+    loaders = {
+        'Bio.Phylo': lambda: calculate_tree_layout(Phylo.read(tree_file_path, 'newick')),
+        'streaming': lambda: read_newick_table(tree_file_path),
+    }
+    results = {}
+    for label, loader in loaders.items():
+        tracemalloc.start()
+        start = time.perf_counter()
+        loader()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[label] = (elapsed, peak)
+        print(f"{label:>10}: {elapsed:8.2f} s, peak memory {peak / 2**20:9.1f} MiB")
+    
+    return results
+
 # Simple example with basic Phylo.draw (alternative method)
 def simple_tree_visualization():
     """Simple tree visualization using basic Phylo.draw"""
@@ -249,9 +685,8 @@ if __name__ == "__main__":
         plt.tight_layout()
         
         # Save in publication formats
-        plt.savefig('03_biopython_phylo_tree.png', dpi=300, bbox_inches='tight')
-        plt.savefig('03_biopython_phylo_tree.pdf', bbox_inches='tight')
-        plt.savefig('03_biopython_phylo_tree.svg', bbox_inches='tight')
+        export_figure(fig, ['03_biopython_phylo_tree.png', '03_biopython_phylo_tree.pdf',
+                            '03_biopython_phylo_tree.svg'], raster_dpi=300, bbox_inches='tight')
         
         print("Tree visualization completed successfully!")
         print("Files saved:")
@@ -296,25 +731,96 @@ def print_tree_structure(tree):
         branch_length = f":{clade.branch_length:.3f}" if clade.branch_length else ""
         print(f"{indent}{name}{branch_length}")
 
+def _coordinate_columns(table):
+    """Node table columns written by export_tree_coordinates"""
+    return {
+        'name': table.names,
+        'parent': table.parent,
+        'branch_length': table.branch_length,
+        'depth': table.depth,
+        'x': table.x,
+        'y': table.y,
+        'is_terminal': table.is_terminal,
+    }
+
 def export_tree_coordinates(tree, filename='tree_coordinates.csv'):
-    """Export tree node coordinates for external use"""
-    import csv
+    """
+    Export tree node coordinates for external use
+    
+    tree may be a Bio.Phylo tree or a NodeTable. The whole node table is
+    written in one bulk operation, in a format chosen by extension:
+    .npz (NumPy), .parquet (requires pyarrow) or CSV for anything else.
+    Use load_tree_coordinates to read .npz/.parquet files back.
+    """
+    if isinstance(tree, NodeTable):
+        table = tree
+    else:
+        table = getattr(tree, 'node_table', None)
+        if table is None:
+            table = build_node_table(tree)
+    columns = _coordinate_columns(table)
+    extension = os.path.splitext(filename)[1].lower()
     
-    with open(filename, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['Node_Name', 'X_Coordinate', 'Y_Coordinate', 'Branch_Length', 'Is_Terminal'])
+    if extension == '.npz':
+        # Fixed-width strings avoid pickling; unnamed nodes become ''
+        names = np.array([name or '' for name in table.names], dtype=str)
+        np.savez_compressed(filename, **{**columns, 'name': names})
+    elif extension == '.parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+        pq.write_table(pa.table(columns), filename)
+    else:
+        import csv
         
-        for clade in tree.find_clades():
-            name = clade.name if clade.name else 'Internal'
-            x_coord = getattr(clade, 'x_coord', 0)
-            y_coord = getattr(clade, 'y_coord', 0)
-            branch_length = clade.branch_length if clade.branch_length else 0
-            is_terminal = clade.is_terminal()
-            
-            writer.writerow([name, x_coord, y_coord, branch_length, is_terminal])
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['Node_Name', 'X_Coordinate', 'Y_Coordinate', 'Branch_Length', 'Is_Terminal'])
+            writer.writerows(zip(
+                [name if name else 'Internal' for name in table.names],
+                table.x.tolist(),
+                table.y.tolist(),
+                # Missing (NaN) and zero lengths are written as 0
+                [length if length == length and length else 0
+                 for length in table.branch_length.tolist()],
+                table.is_terminal.tolist()))
     
     print(f"Tree coordinates exported to {filename}")
 
+def load_tree_coordinates(filename):
+    """
+    Load a NodeTable written by export_tree_coordinates (.npz or .parquet)
+    
+    The result can be passed straight to draw_node_table, so a figure can be
+    redrawn without re-parsing the original tree file.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    
+    if extension == '.npz':
+        with np.load(filename) as data:
+            columns = {key: data[key] for key in data.files}
+        columns['name'] = [name or None for name in columns['name'].tolist()]
+    elif extension == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet import requires pyarrow (pip install pyarrow)")
+        data = pq.read_table(filename)
+        columns = {key: data.column(key).to_numpy(zero_copy_only=False)
+                   for key in data.column_names if key != 'name'}
+        columns['name'] = data.column('name').to_pylist()
+    else:
+        raise ValueError(f"Unsupported coordinate file: {filename} (use .npz or .parquet)")
+    
+    # Rebuild the child index and subtree sizes, then keep the saved coordinates
+    table = layout_node_table(NodeTable(columns['name'], columns['parent'],
+                                        columns['branch_length']))
+    table.x = np.asarray(columns['x'], dtype=float)
+    table.y = np.asarray(columns['y'], dtype=float)
+    return table
+
 # Usage examples:
 """
 # To use your own tree file:
@@ -330,4 +836,10 @@ fig, ax, tree = load_and_visualize_tree('tree.nwk', color_groups=my_colors)
 
 # To debug tree structure:
 print_tree_structure(tree)
+
+# To export the node table and redraw it later without the tree file:
+export_tree_coordinates(tree, 'tree_coordinates.npz')
+table = load_tree_coordinates('tree_coordinates.npz')
+fig, ax = plt.subplots(figsize=(10, 12))
+draw_node_table(table, ax, color_groups=my_colors)
 """
\ No newline at end of file
@@ -3,6 +3,8 @@ import numpy as np
 from matplotlib import rcParams
 import matplotlib.patches as patches
 
+from figure_export import export_figure
+
 # Set publication-ready parameters for Science journal
 rcParams['font.family'] = 'Arial'
 rcParams['font.size'] = 8
@@ -112,12 +114,8 @@ ax.set_axisbelow(True)
 plt.tight_layout()
 
 # Save figure in high resolution for publication
-plt.savefig('03_science_figure.png', dpi=300, bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
-plt.savefig('03_science_figure.pdf', bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
-plt.savefig('science_figure.svg', bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
+export_figure(plt.gcf(), ['03_science_figure.png', '03_science_figure.pdf', 'science_figure.svg'],
+              raster_dpi=300, bbox_inches='tight', facecolor='white', edgecolor='none')
 
 plt.show()
 
@@ -2,6 +2,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.patches import Circle
 
+from figure_export import export_figure
+
 # Set up the figure with high DPI for publication quality
 plt.rcParams['figure.dpi'] = 300
 plt.rcParams['savefig.dpi'] = 300
@@ -57,12 +59,9 @@ ax.axis('off')
 plt.tight_layout()
 
 # Save the figure in multiple formats for publication
-plt.savefig('03_03_rare_diseases_pie_chart.png', dpi=300, bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
-plt.savefig('03_03_rare_diseases_pie_chart.pdf', dpi=300, bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
-plt.savefig('03_03_rare_diseases_pie_chart.eps', dpi=300, bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
+export_figure(plt.gcf(), ['03_03_rare_diseases_pie_chart.png', '03_03_rare_diseases_pie_chart.pdf',
+                         '03_03_rare_diseases_pie_chart.eps'],
+              raster_dpi=300, vector_dpi=300, bbox_inches='tight', facecolor='white', edgecolor='none')
 
 plt.show()
 
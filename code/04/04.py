@@ -1,6 +1,15 @@
+import os
+import sys
+
 import matplotlib.pyplot as plt
 import numpy as np
 
+# series_plot.py lives next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from series_plot import plot_series, series_table
+
+from figure_export import export_figure
+
 # Set up the figure with publication-ready styling
 plt.rcParams.update({
     'font.size': 12,
@@ -34,7 +43,29 @@ very_small_d10 = [0.015 + np.random.normal(0, 0.003), 0.012 + np.random.normal(0
 # Create the figure and axis
 fig, ax = plt.subplots(1, 1, figsize=(8, 6))
 
-import matplotlib.colors as mcolors
+# Series names, legend labels and marker shapes, in plotting order
+series_data = {
+    'large_ring': large_ring,
+    'medium_ring': medium_ring,
+    'small_ring': small_ring,
+    'large_d10': large_d10,
+    'medium_d10': medium_d10,
+    'small_d10': small_d10,
+    'very_small_d10': very_small_d10,
+}
+labels = {
+    'large_ring': 'Large ring',
+    'medium_ring': 'Medium ring',
+    'small_ring': 'Small ring',
+    'large_d10': 'Large D₁₀',
+    'medium_d10': 'Medium D₁₀',
+    'small_d10': 'Small D₁₀',
+    'very_small_d10': 'Very small D₁₀',
+}
+markers = {
+    'large_ring': 's', 'medium_ring': 'o', 'small_ring': '^',
+    'large_d10': 's', 'medium_d10': 'o', 'small_d10': '^', 'very_small_d10': 's',
+}
 
 # Define colors for each series (markers)
 marker_colors = {
@@ -47,39 +78,28 @@ marker_colors = {
     'very_small_d10': 'tan'
 }
 
-# Define lighter line colors (same hue but with transparency)
-line_colors = {
-    'large_ring': mcolors.to_rgba('black', alpha=0.5),
-    'medium_ring': mcolors.to_rgba('darkblue', alpha=0.5), 
-    'small_ring': mcolors.to_rgba('brown', alpha=0.5),
-    'large_d10': mcolors.to_rgba('lightcoral', alpha=0.6),
-    'medium_d10': mcolors.to_rgba('red', alpha=0.5),
-    'small_d10': mcolors.to_rgba('orange', alpha=0.6),
-    'very_small_d10': mcolors.to_rgba('tan', alpha=0.6)
+# Line transparency (lines use the marker color with this alpha)
+line_alphas = {
+    'large_ring': 0.5,
+    'medium_ring': 0.5,
+    'small_ring': 0.5,
+    'large_d10': 0.6,
+    'medium_d10': 0.5,
+    'small_d10': 0.6,
+    'very_small_d10': 0.6
 }
 
+# Build a long-format series table (same layout as a CSV/Parquet input to series_plot.py)
+table = series_table(
+    series=np.repeat(list(series_data), len(x_positions)),
+    x=np.tile(x_positions, len(series_data)),
+    y=np.concatenate(list(series_data.values())),
+    styles={name: {'label': labels[name], 'marker': markers[name], 'color': marker_colors[name],
+                   'line_alpha': line_alphas[name], 'markersize': 8, 'linewidth': 2}
+            for name in series_data})
+
 # Plot lines with different markers and lighter line colors
-ax.plot(x_positions, large_ring, '-s', markersize=8, linewidth=2, 
-        color=line_colors['large_ring'], markerfacecolor=marker_colors['large_ring'], 
-        markeredgecolor=marker_colors['large_ring'], label='Large ring')
-ax.plot(x_positions, medium_ring, '-o', markersize=8, linewidth=2, 
-        color=line_colors['medium_ring'], markerfacecolor=marker_colors['medium_ring'], 
-        markeredgecolor=marker_colors['medium_ring'], label='Medium ring')
-ax.plot(x_positions, small_ring, '-^', markersize=8, linewidth=2, 
-        color=line_colors['small_ring'], markerfacecolor=marker_colors['small_ring'], 
-        markeredgecolor=marker_colors['small_ring'], label='Small ring')
-ax.plot(x_positions, large_d10, '-s', markersize=8, linewidth=2, 
-        color=line_colors['large_d10'], markerfacecolor=marker_colors['large_d10'], 
-        markeredgecolor=marker_colors['large_d10'], label='Large D₁₀')
-ax.plot(x_positions, medium_d10, '-o', markersize=8, linewidth=2, 
-        color=line_colors['medium_d10'], markerfacecolor=marker_colors['medium_d10'], 
-        markeredgecolor=marker_colors['medium_d10'], label='Medium D₁₀')
-ax.plot(x_positions, small_d10, '-^', markersize=8, linewidth=2, 
-        color=line_colors['small_d10'], markerfacecolor=marker_colors['small_d10'], 
-        markeredgecolor=marker_colors['small_d10'], label='Small D₁₀')
-ax.plot(x_positions, very_small_d10, '-s', markersize=8, linewidth=2, 
-        color=line_colors['very_small_d10'], markerfacecolor=marker_colors['very_small_d10'], 
-        markeredgecolor=marker_colors['very_small_d10'], label='Very small D₁₀')
+plot_series(ax, table)
 
 # Set axis properties
 ax.set_xlim(-0.2, 2.2)
@@ -111,10 +131,9 @@ for spine in ax.spines.values():
 plt.tight_layout()
 
 # Save the figure
-plt.savefig('04_figure_reproduction.png', dpi=300, bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
-plt.savefig('04_figure_reproduction.pdf', dpi=300, bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
+export_figure(fig, ['04_figure_reproduction.png', '04_figure_reproduction.pdf'],
+              raster_dpi=300, vector_dpi=300, bbox_inches='tight',
+              facecolor='white', edgecolor='none')
 
 # Display the figure
 plt.show()
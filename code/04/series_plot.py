@@ -0,0 +1,195 @@
+"""
+Data-driven multi-series line plots (generalizes 04.py)
+
+A series table is long-format: one row per point with columns
+    series, x, y
+and optional per-series style columns (the first non-empty value of each
+series is used):
+    label, marker, color, line_alpha, markersize, linewidth, x_label
+`color` is the marker color; the line uses the same color with `line_alpha`.
+`x_label` names the tick at that x position.
+
+Colors are converted to RGBA once for the whole table. Up to
+`max_legend_series` series are drawn with one `ax.plot` per series so they
+get legend entries; beyond that all lines go into one LineCollection and
+markers into one scatter per marker shape.
+
+Usage:
+    python series_plot.py table.csv --output figure.png --xlabel "Molecular set"
+"""
+
+import csv
+import os
+
+import matplotlib.colors as mcolors
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection
+
+STYLE_DEFAULTS = {
+    'label': None,
+    'marker': 'o',
+    'color': 'black',
+    'line_alpha': 0.5,
+    'markersize': 8.0,
+    'linewidth': 2.0,
+}
+
+
+def series_table(series, x, y, styles=None):
+    """
+    Build a series table from long-format columns.
+
+    styles maps series name -> {style column: value}. Series keep the order in
+    which they first appear; points within a series are sorted by x.
+    """
+    series = np.asarray(series)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    styles = styles or {}
+
+    _, first, inverse = np.unique(series, return_index=True, return_inverse=True)
+    # Renumber series by first appearance instead of sorted name
+    rank = np.empty(len(first), dtype=int)
+    rank[np.argsort(first)] = np.arange(len(first))
+    series_index = rank[inverse.ravel()]
+    names = series[np.sort(first)].tolist()
+
+    order = np.lexsort((x, series_index))
+    counts = np.bincount(series_index, minlength=len(names))
+
+    table = {
+        'names': names,
+        'offsets': np.concatenate(([0], np.cumsum(counts))),
+        'series_index': series_index[order],
+        'x': x[order],
+        'y': y[order],
+    }
+    for column, default in STYLE_DEFAULTS.items():
+        values = [styles.get(name, {}).get(column) for name in names]
+        table[column] = [default if value is None else value for value in values]
+    table['label'] = [label if label is not None else str(name)
+                      for label, name in zip(table['label'], names)]
+    for column in ('line_alpha', 'markersize', 'linewidth'):
+        table[column] = np.asarray(table[column], dtype=float)
+
+    # Precompute RGBA once: marker colors, and line colors with per-series alpha
+    table['marker_rgba'] = mcolors.to_rgba_array(table['color'])
+    table['line_rgba'] = table['marker_rgba'].copy()
+    table['line_rgba'][:, 3] = table['line_alpha']
+    table['x_labels'] = {}
+    return table
+
+
+def _read_columns(path):
+    """Read a CSV or Parquet file into {column: list of values}."""
+    if path.lower().endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input requires pyarrow (pip install pyarrow)")
+        return pq.read_table(path).to_pydict()
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        columns = {name: [] for name in reader.fieldnames}
+        for row in reader:
+            for name in reader.fieldnames:
+                value = row[name]
+                columns[name].append(None if value == '' else value)
+    return columns
+
+
+def read_series_table(path):
+    """Read a long-format series table from .csv or .parquet."""
+    columns = _read_columns(path)
+    series = columns['series']
+    styles = {}
+    for column in STYLE_DEFAULTS:
+        for name, value in zip(series, columns.get(column, ())):
+            if value is not None:
+                styles.setdefault(name, {}).setdefault(column, value)
+    table = series_table(series, columns['x'], columns['y'], styles)
+    for x, label in zip(columns['x'], columns.get('x_label', ())):
+        if label is not None:
+            table['x_labels'].setdefault(float(x), label)
+    return table
+
+
+def plot_series(ax, table, legend='auto', max_legend_series=50):
+    """
+    Draw every series of the table on ax.
+
+    legend='auto' uses one ax.plot per series (with legend entries) for up to
+    max_legend_series series, otherwise one LineCollection for all lines plus
+    one scatter per marker shape. legend=True/False forces either path.
+    Returns the list of artists added.
+    """
+    n_series = len(table['names'])
+    per_series = n_series <= max_legend_series if legend == 'auto' else bool(legend)
+    points = np.column_stack([table['x'], table['y']])
+    offsets = table['offsets']
+
+    if per_series:
+        artists = []
+        for k in range(n_series):
+            segment = slice(offsets[k], offsets[k + 1])
+            marker_color = tuple(table['marker_rgba'][k])
+            artists += ax.plot(table['x'][segment], table['y'][segment], '-' + table['marker'][k],
+                               markersize=table['markersize'][k], linewidth=table['linewidth'][k],
+                               color=tuple(table['line_rgba'][k]), markerfacecolor=marker_color,
+                               markeredgecolor=marker_color, label=table['label'][k])
+        return artists
+
+    lines = LineCollection(np.split(points, offsets[1:-1]), colors=table['line_rgba'],
+                           linewidths=table['linewidth'], zorder=2)
+    ax.add_collection(lines)
+    artists = [lines]
+    series_index = table['series_index']
+    markers = np.asarray(table['marker'])
+    for marker in np.unique(markers):
+        mask = markers[series_index] == marker
+        colors = table['marker_rgba'][series_index[mask]]
+        artists.append(ax.scatter(table['x'][mask], table['y'][mask], marker=marker,
+                                  s=table['markersize'][series_index[mask]] ** 2,
+                                  c=colors, edgecolors=colors,
+                                  linewidths=plt.rcParams['lines.markeredgewidth'], zorder=2.1))
+    ax.autoscale_view()
+    return artists
+
+
+def apply_x_labels(ax, table):
+    """Use the table's x_label column (if any) for the x ticks."""
+    if table['x_labels']:
+        positions = sorted(table['x_labels'])
+        ax.set_xticks(positions)
+        ax.set_xticklabels([table['x_labels'][x] for x in positions])
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plot a long-format series table")
+    parser.add_argument('table', help="CSV or Parquet file with series, x, y and style columns")
+    parser.add_argument('--output', default=None, help="Output file (default: <table>.png)")
+    parser.add_argument('--xlabel', default='')
+    parser.add_argument('--ylabel', default='')
+    parser.add_argument('--legend', choices=['auto', 'on', 'off'], default='auto')
+    parser.add_argument('--max-legend-series', type=int, default=50)
+    parser.add_argument('--figsize', type=float, nargs=2, default=(8, 6))
+    parser.add_argument('--dpi', type=int, default=300)
+    args = parser.parse_args()
+
+    table = read_series_table(args.table)
+    fig, ax = plt.subplots(1, 1, figsize=args.figsize)
+    legend = {'auto': 'auto', 'on': True, 'off': False}[args.legend]
+    plot_series(ax, table, legend, args.max_legend_series)
+    apply_x_labels(ax, table)
+    ax.set_xlabel(args.xlabel)
+    ax.set_ylabel(args.ylabel)
+    ax.grid(True, alpha=0.3, linestyle='-', linewidth=0.5)
+    ax.set_axisbelow(True)
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend(loc='upper left', frameon=True, fancybox=False)
+    output = args.output or os.path.splitext(args.table)[0] + '.png'
+    fig.savefig(output, dpi=args.dpi, bbox_inches='tight', facecolor='white', edgecolor='none')
+    print(f"{len(table['names'])} series -> {output}")
@@ -1,19 +1,21 @@
 # 1	Gao, Y.-C. et al. Accelerating battery innovation: AI-powered molecular discovery. Chemical Society Reviews (2025). https://doi.org:10.1039/D5CS00053J
 
+import csv
+import os
+import re
+import sqlite3
+import time
+
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+import matplotlib.colors as mcolors
+from matplotlib.collections import EllipseCollection, LineCollection
+import rdkit
 from rdkit import Chem
 from rdkit.Chem import Draw
 from rdkit.Chem import AllChem
 import numpy as np
 
-# 创建布洛芬分子
-smiles = "CC(C)Cc1ccc(cc1)C(C)C(=O)O"  # 布洛芬
-mol = Chem.MolFromSmiles(smiles)
-
-# 生成2D坐标
-AllChem.Compute2DCoords(mol)
-
 # 定义元素颜色方案
 element_colors = {
     'C': '#404040',   # 碳 - 深灰色
@@ -37,120 +39,549 @@ ring_colors = {
     'P': ['#FFF4E8', '#FFD8B8', '#FFBC88', '#FFA058'],
 }
 
-# 获取原子坐标和信息
-conf = mol.GetConformer()
-atom_info = []
-for i in range(mol.GetNumAtoms()):
-    pos = conf.GetAtomPosition(i)
-    atom = mol.GetAtomWithIdx(i)
-    symbol = atom.GetSymbol()
-    atom_info.append({
-        'pos': (pos.x, pos.y),
-        'symbol': symbol,
-        'color': element_colors.get(symbol, '#808080')
-    })
-
-# 创建图形
-fig, ax = plt.subplots(1, 1, figsize=(16, 10))
-
-# 绘制化学键
-for bond in mol.GetBonds():
-    start_idx = bond.GetBeginAtomIdx()
-    end_idx = bond.GetEndAtomIdx()
-    start_pos = atom_info[start_idx]['pos']
-    end_pos = atom_info[end_idx]['pos']
-    
-    # 根据键的类型设置线宽
-    bond_type = bond.GetBondType()
-    if bond_type == Chem.BondType.DOUBLE:
-        linewidth = 3
-    elif bond_type == Chem.BondType.TRIPLE:
-        linewidth = 4
-    else:
-        linewidth = 2
-    
-    ax.plot([start_pos[0], end_pos[0]], 
-            [start_pos[1], end_pos[1]], 
-            'k-', linewidth=linewidth, zorder=2, alpha=0.6)
-
-# 为每个原子绘制同心圆环
-for atom in atom_info:
-    pos = atom['pos']
-    symbol = atom['symbol']
-    color = atom['color']
-    
-    # 获取该元素对应的环颜色，如果没有则使用默认灰色
-    colors = ring_colors.get(symbol, ['#E8E8E8', '#C8C8C8', '#A8A8A8', '#888888'])
-    
-    # 绘制多个同心圆环（指纹效果）
-    radii = [0.55, 0.45, 0.35, 0.25]
-    for i, (radius, ring_color) in enumerate(zip(radii, colors)):
-        circle = patches.Circle(pos, radius, 
-                               facecolor=ring_color, 
-                               edgecolor=color, 
-                               linewidth=1.2,
-                               alpha=0.5,
-                               zorder=1)
-        ax.add_patch(circle)
-    
+# ===== 单个分子 =====
+def molecule_from_smiles(smiles):
+    """解析 SMILES 并生成 2D 坐标，无法解析或没有原子时返回 None"""
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None or mol.GetNumAtoms() == 0:
+        return None
+    AllChem.Compute2DCoords(mol)
+    return mol
+
+
+def molecule_arrays(mol):
+    """
+    提取绘图所需的数组：元素符号、2D 坐标 (n, 2)、键的两端原子 (m, 2) 和键级 (m,)
+    之后的绘制只依赖这些数组，不再访问 RDKit 对象
+    """
+    coords = np.asarray(mol.GetConformer().GetPositions(), dtype=float)[:, :2]
+    bonds = np.array([(bond.GetBeginAtomIdx(), bond.GetEndAtomIdx()) for bond in mol.GetBonds()],
+                     dtype=np.int32).reshape(-1, 2)
+    bond_orders = np.array([bond.GetBondTypeAsDouble() for bond in mol.GetBonds()], dtype=np.float32)
+    return {
+        'symbols': [atom.GetSymbol() for atom in mol.GetAtoms()],
+        'coords': coords,
+        'bonds': bonds,
+        'bond_orders': bond_orders,
+    }
+
+
+# ===== 2D 结构的磁盘缓存 =====
+class DepictionCache:
+    """
+    以 (规范 SMILES, RDKit 版本) 为键缓存 molecule_arrays 的结果，保存在一个 SQLite 文件中
+    坐标存为 float32、键存为 int32 的字节串；输入的 SMILES 写法另记一张别名表，
+    命中时直接读数组，不调用 RDKit。条目超过 max_entries 时按最近使用时间淘汰（LRU）。
+    """
+
+    def __init__(self, path, max_entries=100_000, version=rdkit.__version__):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version
+        self._puts = 0
+        # 进程池中多个进程共用同一个文件，写锁冲突时等待
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS depictions (
+                canonical TEXT, version TEXT, symbols TEXT, coords BLOB, bonds BLOB,
+                bond_orders BLOB, last_used REAL, PRIMARY KEY (canonical, version));
+            CREATE TABLE IF NOT EXISTS aliases (
+                smiles TEXT, version TEXT, canonical TEXT, PRIMARY KEY (smiles, version));
+            CREATE INDEX IF NOT EXISTS depictions_last_used ON depictions (last_used);
+        """)
+
+    def get(self, smiles):
+        """按输入的 SMILES 查找，未命中返回 None"""
+        row = self.connection.execute(
+            "SELECT d.canonical, d.symbols, d.coords, d.bonds, d.bond_orders FROM aliases a "
+            "JOIN depictions d ON d.canonical = a.canonical AND d.version = a.version "
+            "WHERE a.smiles = ? AND a.version = ?", (smiles, self.version)).fetchone()
+        if row is None:
+            return None
+        canonical, symbols, coords, bonds, bond_orders = row
+        with self.connection:
+            self.connection.execute("UPDATE depictions SET last_used = ? WHERE canonical = ? AND version = ?",
+                                    (time.time(), canonical, self.version))
+        return {
+            'symbols': symbols.split(' '),
+            'coords': np.frombuffer(coords, dtype=np.float32).reshape(-1, 2).astype(float),
+            'bonds': np.frombuffer(bonds, dtype=np.int32).reshape(-1, 2),
+            'bond_orders': np.frombuffer(bond_orders, dtype=np.float32),
+        }
+
+    def put(self, smiles, canonical, molecule):
+        """写入一个分子；每写入 256 个检查一次是否需要淘汰"""
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO depictions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (canonical, self.version, ' '.join(molecule['symbols']),
+                 np.asarray(molecule['coords'], dtype=np.float32).tobytes(),
+                 np.asarray(molecule['bonds'], dtype=np.int32).tobytes(),
+                 np.asarray(molecule['bond_orders'], dtype=np.float32).tobytes(), time.time()))
+            self.connection.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?, ?)",
+                                    (smiles, self.version, canonical))
+        self._puts += 1
+        if self._puts % 256 == 0:
+            self.evict()
+
+    def evict(self):
+        """删除最久未使用的条目，使条目数不超过 max_entries，并清理失效的别名"""
+        with self.connection:
+            (count,) = self.connection.execute("SELECT COUNT(*) FROM depictions").fetchone()
+            if count <= self.max_entries:
+                return
+            self.connection.execute(
+                "DELETE FROM depictions WHERE rowid IN "
+                "(SELECT rowid FROM depictions ORDER BY last_used LIMIT ?)", (count - self.max_entries,))
+            self.connection.execute(
+                "DELETE FROM aliases WHERE NOT EXISTS (SELECT 1 FROM depictions d "
+                "WHERE d.canonical = aliases.canonical AND d.version = aliases.version)")
+
+    def close(self):
+        self.evict()
+        self.connection.close()
+
+
+def load_molecule(smiles, cache=None):
+    """返回 molecule_arrays 的结果，无法解析时返回 None；命中缓存时不调用 RDKit"""
+    if cache is not None:
+        molecule = cache.get(smiles)
+        if molecule is not None:
+            return molecule
+    mol = molecule_from_smiles(smiles)
+    if mol is None:
+        return None
+    molecule = molecule_arrays(mol)
+    if cache is not None:
+        cache.put(smiles, Chem.MolToSmiles(mol), molecule)
+    return molecule
+
+
+# 同心圆环半径（由外到内）与默认环颜色
+RING_RADII = np.array([0.55, 0.45, 0.35, 0.25])
+DEFAULT_RING_COLORS = ['#E8E8E8', '#C8C8C8', '#A8A8A8', '#888888']
+
+# 指纹线条：12 条放射线，长短交替（单位圆方向 × 长度，预先算好）
+SPOKE_ANGLES = np.linspace(0, 2*np.pi, 12, endpoint=False)
+SPOKE_VECTORS = np.column_stack([np.cos(SPOKE_ANGLES), np.sin(SPOKE_ANGLES)]) * \
+    np.where(np.arange(12) % 2 == 0, 0.10, 0.07)[:, None]
+
+
+def bond_linewidths(bond_orders):
+    """根据键的类型设置线宽：双键 3，三键 4，其余（单键、芳香键）2"""
+    return np.select([bond_orders == 2, bond_orders == 3], [3, 4], 2)
+
+
+def draw_fingerprint_collections(ax, molecule, linewidth_scale=1.0):
+    """
+    用集合一次性绘制化学键、同心圆环、中心圆和指纹线条
+    每个分子只产生 4 个集合（加上原子符号文本），绘制顺序和外观与逐个添加时相同
+    molecule 中可选的 'scale'（每个原子一个值）用于缩放圆环和线条大小；
+    linewidth_scale 缩放所有线宽（以磅为单位，不随数据坐标缩放）
+    """
+    symbols, coords = molecule['symbols'], molecule['coords']
+    n_atoms = len(symbols)
+    scale = np.broadcast_to(np.asarray(molecule.get('scale', 1.0), dtype=float), (n_atoms,))
+    element_rgba = mcolors.to_rgba_array([element_colors.get(s, '#808080') for s in symbols])
+
+    # 绘制化学键
+    ax.add_collection(LineCollection(coords[molecule['bonds']],
+                                     linewidths=bond_linewidths(molecule['bond_orders']) * linewidth_scale,
+                                     colors='k', alpha=0.6, zorder=2))
+
+    # 为每个原子绘制同心圆环（按原子、由外到内的顺序，与逐个添加时的叠放次序一致）
+    ring_rgba = mcolors.to_rgba_array([c for s in symbols
+                                       for c in ring_colors.get(s, DEFAULT_RING_COLORS)])
+    ring_diameters = (2 * RING_RADII[None, :] * scale[:, None]).ravel()
+    ax.add_collection(EllipseCollection(ring_diameters, ring_diameters, 0, units='xy',
+                                        offsets=np.repeat(coords, len(RING_RADII), axis=0),
+                                        offset_transform=ax.transData,
+                                        facecolors=ring_rgba,
+                                        edgecolors=np.repeat(element_rgba, len(RING_RADII), axis=0),
+                                        linewidths=1.2 * linewidth_scale, alpha=0.5, zorder=1))
+
     # 在中心绘制指纹图标（颜色与元素对应）
-    circle_center = patches.Circle(pos, 0.18, 
-                                  facecolor=color, 
-                                  edgecolor='white',
-                                  linewidth=2,
-                                  zorder=3)
-    ax.add_patch(circle_center)
-    
-    # 添加指纹线条效果（弧形）
-    num_lines = 12
-    angles = np.linspace(0, 2*np.pi, num_lines, endpoint=False)
-    for j, angle in enumerate(angles):
-        # 交替长短线条，形成指纹效果
-        if j % 2 == 0:
-            length = 0.10
-        else:
-            length = 0.07
-        x_end = pos[0] + length * np.cos(angle)
-        y_end = pos[1] + length * np.sin(angle)
-        ax.plot([pos[0], x_end], [pos[1], y_end], 
-               'w-', linewidth=1.5, zorder=4, alpha=0.8)
-    
+    ax.add_collection(EllipseCollection(0.36 * scale, 0.36 * scale, 0, units='xy',
+                                        offsets=coords, offset_transform=ax.transData,
+                                        facecolors=element_rgba, edgecolors='white',
+                                        linewidths=2 * linewidth_scale, zorder=3))
+
+    # 添加指纹线条效果：每个原子 12 条放射线
+    spoke_starts = np.repeat(coords, len(SPOKE_VECTORS), axis=0)
+    spoke_ends = spoke_starts + np.tile(SPOKE_VECTORS, (n_atoms, 1)) * np.repeat(scale, len(SPOKE_VECTORS))[:, None]
+    ax.add_collection(LineCollection(np.stack([spoke_starts, spoke_ends], axis=1),
+                                     colors='w', linewidths=1.5 * linewidth_scale, alpha=0.8, zorder=4))
+
+
+def draw_fingerprint(ax, molecule, title):
+    """在 ax 上绘制分子指纹图（化学键、同心圆环、指纹线条、元素标注和图例）"""
+    if not isinstance(molecule, dict):
+        molecule = molecule_arrays(molecule)
+    symbols, coords = molecule['symbols'], molecule['coords']
+
+    draw_fingerprint_collections(ax, molecule)
+
     # 标注原子符号在中心（所有原子都标注）
-    ax.text(pos[0], pos[1], symbol, 
-           fontsize=11, fontweight='bold',
-           ha='center', va='center',
-           color='white',
-           zorder=5)
-
-# 设置图形属性
-all_x = [atom['pos'][0] for atom in atom_info]
-all_y = [atom['pos'][1] for atom in atom_info]
-
-ax.set_aspect('equal')
-ax.set_xlim(min(all_x) - 1.5, max(all_x) + 1.5)
-ax.set_ylim(min(all_y) - 1.5, max(all_y) + 1.5)
-ax.axis('off')
-ax.set_facecolor('#F8F8F8')
-
-# 添加标题
-plt.title('Molecular Fingerprint - Ibuprofen', 
-         fontsize=18, fontweight='bold', pad=20, color='#333333')
-
-# 添加图例
-legend_elements = []
-for element in ['C', 'O', 'N', 'S', 'P']:  # 常见元素
-    if any(atom['symbol'] == element for atom in atom_info):
-        legend_elements.append(patches.Patch(facecolor=element_colors[element], 
-                                            edgecolor='white', 
-                                            label=element))
-
-if legend_elements:
-    ax.legend(handles=legend_elements, 
-             loc='upper right', 
-             fontsize=11,
-             framealpha=0.9,
-             title='Elements')
-
-plt.tight_layout()
-plt.savefig("./fingerprint_mol_graph.png", dpi=300)
-plt.show()
+    for (x, y), symbol in zip(coords.tolist(), symbols):
+        ax.text(x, y, symbol, 
+               fontsize=11, fontweight='bold',
+               ha='center', va='center',
+               color='white',
+               zorder=5)
+
+    # 设置图形属性
+    ax.set_aspect('equal')
+    ax.set_xlim(coords[:, 0].min() - 1.5, coords[:, 0].max() + 1.5)
+    ax.set_ylim(coords[:, 1].min() - 1.5, coords[:, 1].max() + 1.5)
+    ax.axis('off')
+    ax.set_facecolor('#F8F8F8')
+
+    # 添加标题
+    ax.set_title(title, 
+                 fontsize=18, fontweight='bold', pad=20, color='#333333')
+
+    # 添加图例
+    legend_elements = []
+    for element in ['C', 'O', 'N', 'S', 'P']:  # 常见元素
+        if element in symbols:
+            legend_elements.append(patches.Patch(facecolor=element_colors[element], 
+                                                edgecolor='white', 
+                                                label=element))
+
+    if legend_elements:
+        ax.legend(handles=legend_elements, 
+                 loc='upper right', 
+                 fontsize=11,
+                 framealpha=0.9,
+                 title='Elements')
+
+
+def fingerprint_figure(molecule, title):
+    """创建图形并绘制一个分子（RDKit Mol 或 molecule_arrays 的结果）"""
+    fig, ax = plt.subplots(1, 1, figsize=(16, 10))
+    draw_fingerprint(ax, molecule, title)
+    fig.tight_layout()
+    return fig
+
+
+# ===== 拼图模式：多个分子共用一个坐标系 =====
+def pack_molecules(molecules, aspect=1 / 1.414, margin=0.8, title_height=1.0, max_extent=None):
+    """
+    按输入顺序逐行排布分子（货架式装箱），返回每个分子的放置参数和页面大小
+    页面宽度按总面积和宽高比 aspect 估计；max_extent 给定时，超过该尺寸的分子等比缩小
+    放置参数为 (lo, scale, offset, title_xy)：新坐标 = (coords - lo) * scale + offset
+    """
+    boxes = []
+    for molecule in molecules:
+        lo = molecule['coords'].min(axis=0)
+        extent = molecule['coords'].max(axis=0) - lo
+        scale = 1.0 if max_extent is None else min(1.0, max_extent / max(extent.max(), 1e-9))
+        boxes.append((lo, scale, extent * scale + 2 * margin + [0, title_height]))
+
+    widths = np.array([size[0] for _, _, size in boxes])
+    heights = np.array([size[1] for _, _, size in boxes])
+    page_width = max(np.sqrt((widths * heights).sum() * aspect), widths.max())
+
+    placements = []
+    x = y = row_height = used_width = 0.0
+    for lo, scale, (width, height) in boxes:
+        if x > 0 and x + width > page_width:
+            x, y, row_height = 0.0, y + row_height, 0.0
+        # 页面自上而下排布，y 轴向下为负
+        offset = np.array([x + margin, -(y + height) + margin])
+        placements.append((lo, scale, offset, (x + width / 2, -y - title_height / 2)))
+        x += width
+        used_width = max(used_width, x)
+        row_height = max(row_height, height)
+    return placements, used_width, y + row_height
+
+
+# 拼图中原子符号的字高：键长的 LABEL_BOND_FRACTION，且不超过分子范围的 LABEL_EXTENT_FRACTION
+LABEL_BOND_FRACTION = 0.2
+LABEL_EXTENT_FRACTION = 0.1
+RDKIT_BOND_LENGTH = 1.5
+
+
+def label_size(molecule, scale=1.0):
+    """按分子的中位键长和坐标范围（与 pack_molecules 同样乘以 scale）确定原子符号字高"""
+    coords, bonds = molecule['coords'], molecule['bonds']
+    if len(bonds):
+        bond_length = np.median(np.linalg.norm(coords[bonds[:, 0]] - coords[bonds[:, 1]], axis=1))
+    else:
+        bond_length = RDKIT_BOND_LENGTH
+    extent = max((coords.max(axis=0) - coords.min(axis=0)).max(), bond_length)
+    return min(LABEL_BOND_FRACTION * bond_length, LABEL_EXTENT_FRACTION * extent) * scale
+
+
+def merge_molecules(molecules, placements):
+    """
+    把所有分子平移、缩放后合并为一个 molecule 字典
+    含每个原子的 'scale' 和原子符号字高 'label_size'
+    """
+    symbols, coords, bonds, orders, scales, label_sizes = [], [], [], [], [], []
+    n_atoms = 0
+    for molecule, (lo, scale, offset, _) in zip(molecules, placements):
+        symbols += molecule['symbols']
+        coords.append((molecule['coords'] - lo) * scale + offset)
+        bonds.append(molecule['bonds'] + n_atoms)
+        orders.append(molecule['bond_orders'])
+        scales.append(np.full(len(molecule['symbols']), scale))
+        label_sizes.append(np.full(len(molecule['symbols']), label_size(molecule, scale)))
+        n_atoms += len(molecule['symbols'])
+    return {
+        'symbols': symbols,
+        'coords': np.vstack(coords),
+        'bonds': np.vstack(bonds),
+        'bond_orders': np.concatenate(orders),
+        'scale': np.concatenate(scales),
+        'label_size': np.concatenate(label_sizes),
+    }
+
+
+def atom_label_patch(symbols, coords, size=0.15, linewidth=0.5):
+    """
+    所有原子符号合成一个 PathPatch（字形路径按数据坐标放置），代替逐个 ax.text
+    size 为字高（数据坐标单位，可每个原子一个值）；白色字形加深色描边，
+    画在指纹线条（zorder=4）之上
+    """
+    from matplotlib.font_manager import FontProperties
+    from matplotlib.path import Path
+    from matplotlib.textpath import TextPath
+
+    prop = FontProperties(weight='bold')
+    glyphs = {}
+    for symbol in set(symbols):
+        path = TextPath((0, 0), symbol, size=1, prop=prop)
+        center = (path.vertices.min(axis=0) + path.vertices.max(axis=0)) / 2
+        glyphs[symbol] = (path.vertices - center, path.codes)
+
+    size = np.broadcast_to(np.asarray(size, dtype=float), (len(symbols),))
+    paths = [Path(glyphs[symbol][0] * s + xy, glyphs[symbol][1])
+             for symbol, xy, s in zip(symbols, coords, size)]
+    return patches.PathPatch(Path.make_compound_path(*paths), facecolor='white',
+                             edgecolor='#333333', linewidth=linewidth, zorder=6)
+
+
+def mosaic_figure(molecules, titles, width_in=16, aspect=1 / 1.414, max_extent=None, title_size=0.45):
+    """
+    N 个分子排在一张图的同一个坐标轴上：全部分子只用 4 个集合 + 1 个原子符号路径 + N 个标题
+    title_size 为标题字高（数据坐标单位），字号随页面大小换算
+    """
+    placements, page_width, page_height = pack_molecules(molecules, aspect, max_extent=max_extent)
+    fig = plt.figure(figsize=(width_in, width_in * page_height / page_width))
+    ax = fig.add_axes([0, 0, 1, 1])
+    points_per_unit = width_in * 72 / page_width
+
+    merged = merge_molecules(molecules, placements)
+    # 单个分子图中约 90 磅对应一个坐标单位，线宽按比例缩小
+    linewidth_scale = min(1.0, points_per_unit / 90)
+    draw_fingerprint_collections(ax, merged, linewidth_scale=linewidth_scale)
+    ax.add_patch(atom_label_patch(merged['symbols'], merged['coords'], merged['label_size'],
+                                  linewidth=0.5 * linewidth_scale))
+    for (_, _, _, (x, y)), title in zip(placements, titles):
+        ax.text(x, y, title, fontsize=title_size * points_per_unit, ha='center', va='center',
+                color='#333333', clip_on=True)
+
+    ax.set_xlim(0, page_width)
+    ax.set_ylim(-page_height, 0)
+    ax.set_aspect('equal')
+    ax.axis('off')
+    fig.patch.set_facecolor('#F8F8F8')
+    return fig
+
+
+def render_mosaic(smiles_path, output, column='smiles', limit=None, cache_path=None, dpi=200,
+                  width_in=16, max_extent=None):
+    """把 SMILES 文件中的分子（可限制前 limit 个）画成一张拼图，输出 PNG/PDF"""
+    from itertools import islice
+
+    start = time.perf_counter()
+    cache = DepictionCache(cache_path) if cache_path else None
+    molecules, titles, invalid = [], [], []
+    for index, smiles, name in islice(iter_smiles(smiles_path, column), limit):
+        molecule = load_molecule(smiles, cache)
+        if molecule is None:
+            invalid.append((index, smiles))
+            continue
+        molecules.append(molecule)
+        titles.append(name or smiles)
+    if cache is not None:
+        cache.close()
+
+    if not molecules:
+        print(f"{smiles_path} 中没有可解析的 SMILES，未生成拼图 {output}；无效 SMILES {len(invalid)} 个：")
+        for index, smiles in invalid:
+            print(f"  {index}: {smiles}")
+        return invalid
+
+    fig = mosaic_figure(molecules, titles, width_in, max_extent=max_extent)
+    fig.savefig(output, dpi=dpi)
+    plt.close(fig)
+    print(f"拼图 {output}：{len(molecules)} 个分子，跳过无效 SMILES {len(invalid)} 个，"
+          f"耗时 {time.perf_counter() - start:.1f} s")
+    return invalid
+
+
+# ===== 批量模式：从 SMILES 文件流式读取，进程池渲染 =====
+# 输出路径格式：index 为分子序号，name 为名称（没有时用 mol），shard = index // 1000 用于分目录
+OUTPUT_PATTERN = '{shard:03d}/{index:06d}_{name}.png'
+
+
+def iter_smiles(path, column='smiles'):
+    """
+    逐行读取 SMILES，生成 (序号, SMILES, 名称)
+    .csv 文件取 column 列，若有 name/id 列则作为名称；其他文件每行为 'SMILES [名称]'，# 开头为注释
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            name_column = next((c for c in ('name', 'Name', 'id', 'ID') if c in reader.fieldnames), None)
+            for index, row in enumerate(reader):
+                yield index, row[column].strip(), row[name_column].strip() if name_column else ''
+        else:
+            index = 0
+            for line in f:
+                fields = line.split(maxsplit=1)
+                if not fields or fields[0].startswith('#'):
+                    continue
+                yield index, fields[0], fields[1].strip() if len(fields) > 1 else ''
+                index += 1
+
+
+def output_path(output_dir, pattern, index, name):
+    """按 pattern 生成输出路径，名称中的特殊字符替换为下划线"""
+    safe_name = re.sub(r'[^\w.-]+', '_', name)[:64].strip('_') or 'mol'
+    return os.path.join(output_dir, pattern.format(index=index, name=safe_name, shard=index // 1000))
+
+
+_worker_cache = None
+
+
+def _init_worker(cache_path=None):
+    """进程池初始化：Agg 后端，关闭 RDKit 对无效 SMILES 的报错输出，每个进程打开自己的缓存连接"""
+    global _worker_cache
+    import matplotlib
+    matplotlib.use('Agg')
+    from rdkit import RDLogger
+    RDLogger.DisableLog('rdApp.*')
+    if cache_path:
+        _worker_cache = DepictionCache(cache_path)
+
+
+def _render_smiles(index, smiles, name, path, dpi):
+    """进程池工作函数：解析并渲染一个分子，返回 (序号, SMILES, 名称, 输出路径, 错误信息)"""
+    try:
+        molecule = load_molecule(smiles, _worker_cache)
+        if molecule is None:
+            return index, smiles, name, None, 'RDKit 无法解析'
+        fig = fingerprint_figure(molecule, f'Molecular Fingerprint - {name or smiles}')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fig.savefig(path, dpi=dpi)
+        plt.close(fig)
+    except Exception as exc:
+        plt.close('all')
+        return index, smiles, name, None, f'{type(exc).__name__}: {exc}'
+    return index, smiles, name, path, None
+
+
+def batch_render(smiles_path, output_dir, column='smiles', pattern=OUTPUT_PATTERN, dpi=100,
+                 workers=None, parallel=True, report_every=1000, cache_path=None):
+    """
+    批量渲染 SMILES 文件中的所有分子
+    文件按行流式读取，进程池中同时排队的任务数有上限，内存不随分子数增长；
+    无效 SMILES 写入 output_dir/invalid_smiles.csv，最后报告吞吐量（分子/秒）
+    给定 cache_path 时 2D 结构从磁盘缓存读取，只改样式的重复运行不再调用 RDKit
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {'total': 0, 'rendered': 0, 'invalid': 0}
+    start = time.perf_counter()
+
+    with open(os.path.join(output_dir, 'invalid_smiles.csv'), 'w', newline='', encoding='utf-8') as f:
+        report = csv.writer(f)
+        report.writerow(['index', 'name', 'smiles', 'reason'])
+
+        def collect(result):
+            index, smiles, name, path, error = result
+            stats['total'] += 1
+            if error is None:
+                stats['rendered'] += 1
+            else:
+                stats['invalid'] += 1
+                report.writerow([index, name, smiles, error])
+            if stats['total'] % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{stats['total']} 个分子，{stats['total'] / elapsed:.1f} 个/s")
+
+        tasks = ((index, smiles, name, output_path(output_dir, pattern, index, name), dpi)
+                 for index, smiles, name in iter_smiles(smiles_path, column))
+        if parallel:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(cache_path,)) as pool:
+                pending = set()
+                for task in tasks:
+                    pending.add(pool.submit(_render_smiles, *task))
+                    if len(pending) >= 4 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future.result())
+                for future in pending:
+                    collect(future.result())
+            if cache_path:
+                # 工作进程不会调用 close，最后统一淘汰一次
+                DepictionCache(cache_path).close()
+        else:
+            _init_worker(cache_path)
+            for task in tasks:
+                collect(_render_smiles(*task))
+            if _worker_cache is not None:
+                _worker_cache.close()
+
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = elapsed
+    stats['per_second'] = stats['total'] / elapsed if elapsed else 0.0
+    print(f"共 {stats['total']} 个分子：渲染 {stats['rendered']}，无效 {stats['invalid']}；"
+          f"耗时 {elapsed:.1f} s，{stats['per_second']:.1f} 个/s"
+          f"（{workers if parallel else 1} 个进程）")
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="分子指纹图")
+    parser.add_argument('--smiles-file', help="批量模式：SMILES 文件（每行一个，或 .csv）")
+    parser.add_argument('--column', default='smiles', help=".csv 中 SMILES 所在列")
+    parser.add_argument('--output-dir', default='./fingerprints', help="批量模式输出目录")
+    parser.add_argument('--pattern', default=OUTPUT_PATTERN, help="输出文件名格式")
+    parser.add_argument('--dpi', type=int, default=100, help="批量模式分辨率")
+    parser.add_argument('--workers', type=int, default=None, help="进程数（默认 CPU 核数）")
+    parser.add_argument('--serial', action='store_true', help="不使用进程池")
+    parser.add_argument('--cache', default=None,
+                        help="2D 结构缓存文件（如 ./fingerprint_cache.sqlite），默认不缓存")
+    parser.add_argument('--mosaic', help="拼图模式：把 --smiles-file 中的分子画在一张图上（.png/.pdf）")
+    parser.add_argument('--limit', type=int, default=None, help="拼图模式最多使用的分子数")
+    parser.add_argument('--max-extent', type=float, default=None, help="拼图中超过该尺寸的分子等比缩小")
+    args = parser.parse_args()
+    cache_path = args.cache
+
+    if args.smiles_file and args.mosaic:
+        render_mosaic(args.smiles_file, args.mosaic, args.column, args.limit, cache_path,
+                      max_extent=args.max_extent)
+    elif args.smiles_file:
+        batch_render(args.smiles_file, args.output_dir, args.column, args.pattern, args.dpi,
+                     args.workers, not args.serial, cache_path=cache_path)
+    else:
+        # 创建布洛芬分子
+        smiles = "CC(C)Cc1ccc(cc1)C(C)C(=O)O"  # 布洛芬
+        cache = DepictionCache(cache_path) if cache_path else None
+        molecule = load_molecule(smiles, cache)
+        if cache is not None:
+            cache.close()
+
+        fig = fingerprint_figure(molecule, 'Molecular Fingerprint - Ibuprofen')
+        plt.savefig("./fingerprint_mol_graph.png", dpi=300)
+        plt.show()
@@ -0,0 +1,283 @@
+"""
+Content-addressed cache for exported figures
+
+A figure's key hashes everything that can change its output files:
+    - the source of the script that builds it
+    - the figure contents (pickled figure, i.e. every artist's data and style),
+      or explicit input data arrays when given
+    - rcParams (except the backend) and the Matplotlib version
+    - the output file names and export options
+When the key is already cached, the stored PNG/PDF/SVG files are copied to
+the requested paths and the figure is not rendered at all.
+
+Each entry is a directory named by its key. Entries are used least recently
+first for eviction once the cache exceeds its size cap.
+
+Coverage:
+    - scripts that save through export_figure (Science/01, Science/03,
+      code/04, the phase diagram, performance_comparition_2d_plot) use the
+      cache whenever FIGURE_CACHE_DIR is set;
+    - every other script (plain plt.savefig / fig.savefig, e.g. plot_category/*,
+      code/07, 02_2025Science_ShadedRegion) is cached per savefig call when run
+      through `python figure_export.py --run SCRIPT ...`, which installs
+      savefig_hook. Saves to file objects (e.g. BytesIO) are never cached.
+The nightly job should run every script through --run.
+
+Environment variables for batch jobs:
+    FIGURE_CACHE_DIR        cache directory (enables caching)
+    FIGURE_CACHE_MAX_BYTES  size cap in bytes (default 2 GiB)
+    FIGURE_CACHE_REFRESH=1  ignore cached entries and re-render (refreshes them)
+"""
+
+import contextlib
+import hashlib
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import matplotlib as mpl
+import numpy as np
+from matplotlib.cbook import CallbackRegistry
+from matplotlib.figure import Figure
+from matplotlib.transforms import TransformNode
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+# Cache hits / renders since start-up, for reporting
+STATS = {'hits': 0, 'renders': 0}
+_hook_paused = 0
+
+
+class _FigurePickler(pickle.Pickler):
+    """Pickles a figure the same way on every run."""
+
+    def reducer_override(self, obj):
+        if isinstance(obj, TransformNode):
+            reduced = list(obj.__reduce_ex__(4))
+            # Transform parents are keyed by id(); number them in insertion order instead
+            state = dict(reduced[2])
+            state['_parents'] = dict(enumerate(state.get('_parents', {}).values()))
+        elif isinstance(obj, CallbackRegistry):
+            reduced = list(obj.__reduce_ex__(4))
+            # Pickling advances the callback id counter, so its value depends on earlier pickles
+            state = dict(reduced[2])
+            state.pop('_cid_gen', None)
+        else:
+            return NotImplemented
+        reduced[2] = state
+        return tuple(reduced)
+
+
+def _figure_bytes(fig):
+    buffer = io.BytesIO()
+    _FigurePickler(buffer, protocol=4).dump(fig)
+    return buffer.getvalue()
+
+
+class _DetachedPickler(pickle.Pickler):
+    """Pickles a figure without re-registering the copy with pyplot on load."""
+
+    def reducer_override(self, obj):
+        if not isinstance(obj, Figure):
+            return NotImplemented
+        reduced = list(obj.__reduce_ex__(4))
+        reduced[2] = {key: value for key, value in reduced[2].items() if key != '_restore_to_pylab'}
+        return tuple(reduced)
+
+
+def _detached_copy(fig):
+    buffer = io.BytesIO()
+    _DetachedPickler(buffer, protocol=4).dump(fig)
+    return pickle.loads(buffer.getvalue())
+
+
+def _update_with_data(digest, value):
+    """Hash arrays by dtype/shape/bytes; other objects by pickle."""
+    if isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_with_data(digest, item)
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode())
+            _update_with_data(digest, value[key])
+    else:
+        digest.update(pickle.dumps(value, protocol=4))
+
+
+def figure_key(fig=None, source=None, data=None, paths=(), options=None):
+    """
+    Key for a figure export, or None if the figure cannot be fingerprinted.
+
+    source: path of the script that builds the figure.
+    data: input arrays/objects; when None the pickled figure is hashed instead.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(mpl.__version__.encode())
+    if source is not None and os.path.exists(source):
+        with open(source, 'rb') as f:
+            digest.update(f.read())
+    try:
+        if data is not None:
+            _update_with_data(digest, data)
+        else:
+            digest.update(_figure_bytes(fig))
+    except Exception:
+        # Unpicklable artists (e.g. lambdas in formatters): do not cache
+        return None
+    params = {key: value for key, value in mpl.rcParams.items()
+              if not key.startswith('backend') and key != 'interactive'}
+    digest.update(repr(sorted(params.items())).encode())
+    digest.update(repr([os.path.basename(p) for p in paths]).encode())
+    digest.update(repr(sorted((options or {}).items(), key=repr)).encode())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Directory of cached exports with a size cap and LRU eviction."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, refresh=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_environment(cls):
+        """FigureCache configured by FIGURE_CACHE_* variables, or None if not enabled."""
+        directory = os.environ.get('FIGURE_CACHE_DIR')
+        if not directory:
+            return None
+        max_bytes = int(os.environ.get('FIGURE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        refresh = os.environ.get('FIGURE_CACHE_REFRESH', '') not in ('', '0')
+        return cls(directory, max_bytes, refresh)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+
+    def restore(self, key, paths):
+        """Copy cached files to paths; True on a hit (never hits when refreshing)."""
+        entry = self._entry(key)
+        cached = [os.path.join(entry, os.path.basename(p)) for p in paths]
+        if self.refresh or not all(os.path.exists(c) for c in cached):
+            STATS['renders'] += 1
+            return False
+        for source, path in zip(cached, paths):
+            shutil.copyfile(source, path)
+        # The entry's mtime records its last use for LRU eviction
+        os.utime(entry)
+        STATS['hits'] += 1
+        return True
+
+    def store(self, key, paths):
+        """Copy freshly written files into the cache and evict old entries."""
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.staging-')
+        for path in paths:
+            shutil.copyfile(path, os.path.join(staging, os.path.basename(path)))
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            shutil.rmtree(entry)
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            # Another process stored the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def entries(self):
+        """[(last used, size in bytes, path)] for every entry, oldest first."""
+        result = []
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isdir(entry):
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry) if f.is_file())
+            result.append((os.stat(entry).st_mtime, size, entry))
+        return sorted(result)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, entry in self.entries():
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def savefig_hook(source, cache=None):
+    """
+    Route every Figure.savefig(path, ...) through the cache while active.
+    On a miss an unpickled copy of the figure is saved (identical pixels); figures
+    that cannot be pickled are saved directly and not cached.
+
+    source: path of the script being run, hashed into every key.
+    cache: FigureCache, or None to use FIGURE_CACHE_DIR (the hook does nothing if unset).
+    """
+    cache = cache or FigureCache.from_environment()
+    savefig = Figure.savefig
+
+    def cached_savefig(fig, fname, *args, **kwargs):
+        if cache is None or _hook_paused or args or not isinstance(fname, (str, os.PathLike)):
+            return savefig(fig, fname, *args, **kwargs)
+        path = os.fspath(fname)
+        key = figure_key(fig, source, None, [path], kwargs)
+        if key is None:
+            return savefig(fig, fname, **kwargs)
+        if cache.restore(key, [path]):
+            return
+        # Drawing changes the figure's pickled state (ticks, transform caches), so save a
+        # copy: the script's figure stays undrawn and later keys match on hits and misses
+        target = fig if 'bbox_extra_artists' in kwargs else _detached_copy(fig)
+        savefig(target, fname, **kwargs)
+        cache.store(key, [path])
+
+    Figure.savefig = cached_savefig
+    try:
+        yield
+    finally:
+        Figure.savefig = savefig
+
+
+@contextlib.contextmanager
+def savefig_hook_paused():
+    """export_figure caches its outputs itself; its internal savefig calls skip the hook."""
+    global _hook_paused
+    _hook_paused += 1
+    try:
+        yield
+    finally:
+        _hook_paused -= 1
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the figure cache")
+    parser.add_argument('directory', nargs='?', default=os.environ.get('FIGURE_CACHE_DIR'))
+    parser.add_argument('--clear', action='store_true', help="Remove every cached entry")
+    args = parser.parse_args()
+    if not args.directory:
+        parser.error("give a cache directory or set FIGURE_CACHE_DIR")
+
+    cache = FigureCache(args.directory)
+    if args.clear:
+        cache.clear()
+    entries = cache.entries()
+    total = sum(size for _, size, _ in entries)
+    print(f"{len(entries)} entries, {total / 1024**2:.1f} MiB in {args.directory}")
+    for last_used, size, entry in entries[-10:]:
+        print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(last_used))} "
+              f"{size / 1024:8.0f} KiB  {os.path.basename(entry)}")
@@ -0,0 +1,310 @@
+"""
+Single-render multi-format figure export shared by the figure scripts
+
+Calling plt.savefig once per format re-runs the whole pipeline every time, and
+with bbox_inches='tight' each call draws the figure twice (one pass to measure
+the tight bbox, one to write the file). export_figure instead:
+
+1. draws the figure once with Agg at the raster dpi and measures the tight
+   bbox during that same draw;
+2. forks one process per vector format (PDF/SVG/EPS), each saving with the
+   precomputed bbox so no second layout pass is needed;
+3. meanwhile crops the already-rendered RGBA buffer and writes the PNG (and
+   any JPEG/TIFF/WebP outputs).
+
+Forking is only done with a non-interactive backend (Agg, PDF, SVG, ...) on
+Linux; with a GUI backend, on macOS or without fork the vector files are
+written sequentially.
+
+Usage in a script:
+    from figure_export import export_figure
+    export_figure(fig, ['out.png', 'out.pdf', 'out.svg'], raster_dpi=300,
+                  bbox_inches='tight', facecolor='white')
+
+Scripts import this module from the repository root, so run them through
+--run (which puts the root on sys.path and runs each script in its own
+directory), or from the root with the root on the path:
+    python figure_export.py --run Science/01/25Science01Fig5A.py
+    PYTHONPATH=. python Science/01/25Science01Fig5A.py
+
+Set FIGURE_CACHE_DIR to reuse previous exports when nothing changed (see
+figure_cache.py); FIGURE_CACHE_REFRESH=1 forces a re-render. Scripts that
+call savefig directly are cached when run through this module:
+    FIGURE_CACHE_DIR=~/.cache/figures python figure_export.py --run plot_category/bar/*.py ...
+
+Benchmark the existing scripts (sequential savefig vs export_figure):
+    python figure_export.py --benchmark Science/01/25Science01Fig5A.py ...
+"""
+
+import inspect
+import io
+import multiprocessing
+import os
+import sys
+import time
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.transforms import Bbox
+
+from figure_cache import STATS, FigureCache, figure_key, savefig_hook, savefig_hook_paused
+
+# Repository root: scripts run through --run import figure_export from here
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Formats Agg rasterizes; saved at raster_dpi by cropping the single rendered buffer
+RASTER_FORMATS = {'png', 'jpg', 'jpeg', 'tif', 'tiff', 'webp'}
+# Backends without a GUI event loop, where forking the process is safe
+NON_INTERACTIVE_BACKENDS = {'agg', 'pdf', 'svg', 'ps', 'pgf', 'cairo', 'template'}
+
+# Set by --benchmark: every export_figure call also times the sequential savefig path
+BENCHMARK = False
+
+
+def _format(path):
+    return os.path.splitext(path)[1][1:].lower()
+
+
+def _render_raster(fig, dpi, tight, pad_inches, bbox_extra_artists, savefig_kwargs):
+    """Draw once with Agg; return (RGBA array, figure height in px, tight bbox or None)."""
+    captured = []
+
+    def on_draw(event):
+        if tight:
+            captured.append(fig.get_tightbbox(event.renderer, bbox_extra_artists=bbox_extra_artists))
+
+    buffer = io.BytesIO()
+    cid = fig.canvas.mpl_connect('draw_event', on_draw)
+    try:
+        # 'standard' keeps savefig from adding its own tight-bbox pass
+        with mpl.rc_context({'savefig.bbox': 'standard'}):
+            fig.savefig(buffer, format='rgba', dpi=dpi, **savefig_kwargs)
+    finally:
+        fig.canvas.mpl_disconnect(cid)
+
+    width_in, height_in = fig.get_size_inches()
+    shape = (int(height_in * dpi), int(width_in * dpi), 4)
+    rgba = np.frombuffer(buffer.getbuffer(), dtype=np.uint8).reshape(shape)
+    bbox = None
+    if captured:
+        if pad_inches is None or pad_inches == 'layout':
+            pad_inches = mpl.rcParams['savefig.pad_inches']
+        bbox = captured[-1].padded(pad_inches)
+    return rgba, height_in * dpi, bbox
+
+
+def _crop(rgba, height_px, bbox, dpi):
+    """Crop the full-figure buffer to bbox (inches); None if bbox leaves the figure."""
+    if bbox is None:
+        return rgba
+    x0 = int(round(bbox.x0 * dpi))
+    top = int(round(height_px - bbox.y1 * dpi))
+    width, height = int(bbox.width * dpi), int(bbox.height * dpi)
+    if x0 < 0 or top < 0 or x0 + width > rgba.shape[1] or top + height > rgba.shape[0]:
+        return None
+    return rgba[top:top + height, x0:x0 + width]
+
+
+def _can_fork():
+    """Fork only without GUI state (event loop, Cocoa) that a child could deadlock on."""
+    return (sys.platform != 'darwin' and 'fork' in multiprocessing.get_all_start_methods()
+            and mpl.get_backend().lower() in NON_INTERACTIVE_BACKENDS)
+
+
+def _save_in_child(fig, path, kwargs):
+    """Forked worker: the figure is inherited from the parent, nothing is pickled."""
+    fig.savefig(path, **kwargs)
+
+
+def export_figure(fig, paths, raster_dpi=None, vector_dpi=None, bbox_inches=None, pad_inches=None,
+                  bbox_extra_artists=None, parallel=True, cache=None, cache_data=None, source=None,
+                  **savefig_kwargs):
+    """
+    Save fig to every path in paths with a single Agg render.
+
+    raster_dpi / vector_dpi default to savefig's own default (rcParams['savefig.dpi']).
+    bbox_inches follows savefig ('tight', a Bbox, or None for rcParams['savefig.bbox']).
+    Remaining keyword arguments (facecolor, edgecolor, ...) go to every savefig call.
+
+    cache: FigureCache, or None to use FIGURE_CACHE_DIR (no caching if unset).
+    cache_data: input arrays to key the cache on; by default the pickled figure is hashed.
+    source: script path hashed into the key; defaults to the calling script.
+    Returns the wall-clock time in seconds.
+    """
+    if source is None:
+        source = inspect.currentframe().f_back.f_code.co_filename
+    with savefig_hook_paused():
+        return _export_figure(fig, paths, raster_dpi, vector_dpi, bbox_inches, pad_inches,
+                              bbox_extra_artists, parallel, cache, cache_data, source, savefig_kwargs)
+
+
+def _export_figure(fig, paths, raster_dpi, vector_dpi, bbox_inches, pad_inches,
+                   bbox_extra_artists, parallel, cache, cache_data, source, savefig_kwargs):
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    if cache is None and not BENCHMARK:
+        cache = FigureCache.from_environment()
+    key = None
+    if cache is not None:
+        start = time.perf_counter()
+        options = dict(savefig_kwargs, raster_dpi=raster_dpi, vector_dpi=vector_dpi,
+                       bbox_inches=bbox_inches, pad_inches=pad_inches)
+        key = figure_key(fig, source, cache_data, paths, options)
+        if key is not None and cache.restore(key, paths):
+            return time.perf_counter() - start
+
+    if bbox_inches is None:
+        bbox_inches = mpl.rcParams['savefig.bbox']
+    tight = isinstance(bbox_inches, str) and bbox_inches == 'tight'
+    if raster_dpi is None:
+        raster_dpi = mpl.rcParams['savefig.dpi']
+    if raster_dpi == 'figure':
+        raster_dpi = fig.dpi
+    raster_paths = [p for p in paths if _format(p) in RASTER_FORMATS]
+    vector_paths = [p for p in paths if _format(p) not in RASTER_FORMATS]
+
+    if BENCHMARK:
+        sequential = _sequential_export(fig, paths, raster_dpi, vector_dpi, bbox_inches,
+                                        pad_inches, bbox_extra_artists, savefig_kwargs)
+
+    start = time.perf_counter()
+    rgba = height_px = None
+    bbox = bbox_inches if isinstance(bbox_inches, Bbox) else None
+    if raster_paths or tight:
+        rgba, height_px, tight_bbox = _render_raster(fig, raster_dpi, tight, pad_inches,
+                                                     bbox_extra_artists, savefig_kwargs)
+        bbox = tight_bbox if tight else bbox
+
+    vector_kwargs = dict(savefig_kwargs, dpi=vector_dpi, bbox_inches=bbox)
+    use_fork = parallel and len(vector_paths) > 0 and _can_fork()
+    workers = []
+    if use_fork:
+        context = multiprocessing.get_context('fork')
+        for path in vector_paths:
+            worker = context.Process(target=_save_in_child, args=(fig, path, vector_kwargs))
+            worker.start()
+            workers.append((path, worker))
+
+    for path in raster_paths:
+        image = _crop(rgba, height_px, bbox, raster_dpi)
+        if image is None:
+            # Artists outside the figure: let savefig resize the canvas as usual
+            fig.savefig(path, dpi=raster_dpi, bbox_inches=bbox, **savefig_kwargs)
+        else:
+            plt.imsave(path, image, dpi=raster_dpi, format=_format(path))
+
+    if not use_fork:
+        for path in vector_paths:
+            fig.savefig(path, **vector_kwargs)
+    failed = []
+    for path, worker in workers:
+        worker.join()
+        if worker.exitcode != 0:
+            failed.append(path)
+    if failed:
+        raise RuntimeError(f"Failed to save: {', '.join(failed)}")
+    if key is not None:
+        cache.store(key, paths)
+
+    elapsed = time.perf_counter() - start
+    if BENCHMARK:
+        print(f"  {', '.join(os.path.basename(p) for p in paths)}: "
+              f"sequential savefig {sequential:.2f} s, export_figure {elapsed:.2f} s "
+              f"({sequential / elapsed:.2f}x)")
+    return elapsed
+
+
+def _sequential_export(fig, paths, raster_dpi, vector_dpi, bbox_inches, pad_inches,
+                       bbox_extra_artists, savefig_kwargs):
+    """The old way: one full savefig per format. Returns seconds."""
+    start = time.perf_counter()
+    for path in paths:
+        dpi = raster_dpi if _format(path) in RASTER_FORMATS else vector_dpi
+        fig.savefig(path, dpi=dpi, bbox_inches=bbox_inches, pad_inches=pad_inches,
+                    bbox_extra_artists=bbox_extra_artists, **savefig_kwargs)
+    return time.perf_counter() - start
+
+
+def _run_script(script, directory):
+    """
+    Run a script as __main__ in directory with Agg and no plt.show; False if it failed.
+    rcParams start from the matplotlibrc defaults, as in a standalone run, and whatever
+    the script sets is undone afterwards so it cannot leak into the next script.
+    """
+    import runpy
+
+    mpl.use('Agg')
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    show, argv, cwd = plt.show, sys.argv, os.getcwd()
+    plt.show = lambda *args, **kwargs: None
+    sys.argv = [script]
+    os.chdir(directory)
+    try:
+        with mpl.rc_context():
+            mpl.rc_file_defaults()
+            runpy.run_path(script, run_name='__main__')
+        return True
+    except Exception as exc:
+        print(f"  failed: {type(exc).__name__}: {exc}")
+        return False
+    finally:
+        plt.show, sys.argv = show, argv
+        os.chdir(cwd)
+        plt.close('all')
+
+
+def run_scripts(scripts):
+    """
+    Run each script in its own directory with every savefig call going through the
+    figure cache (FIGURE_CACHE_DIR). Returns the scripts that failed.
+    """
+    failed = []
+    for script in scripts:
+        script = os.path.abspath(script)
+        hits, renders = STATS['hits'], STATS['renders']
+        start = time.perf_counter()
+        with savefig_hook(script):
+            ok = _run_script(script, os.path.dirname(script))
+        if not ok:
+            failed.append(script)
+        print(f"{script}: {STATS['hits'] - hits} cached, {STATS['renders'] - renders} rendered, "
+              f"{time.perf_counter() - start:.2f} s")
+    return failed
+
+
+def benchmark_scripts(scripts):
+    """Run each script in a scratch directory with Agg, timing every export_figure call."""
+    import tempfile
+
+    global BENCHMARK
+    BENCHMARK = True
+    try:
+        for script in scripts:
+            script = os.path.abspath(script)
+            print(script)
+            with tempfile.TemporaryDirectory() as scratch:
+                _run_script(script, scratch)
+    finally:
+        BENCHMARK = False
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Single-render multi-format figure export")
+    parser.add_argument('--benchmark', nargs='+', metavar='SCRIPT',
+                        help="Run scripts and compare sequential savefig with export_figure")
+    parser.add_argument('--run', nargs='+', metavar='SCRIPT',
+                        help="Run scripts in their own directories, caching every savefig "
+                             "when FIGURE_CACHE_DIR is set")
+    args = parser.parse_args()
+    # Scripts import this file as 'figure_export', which is a different module from __main__
+    import importlib
+    module = importlib.import_module('figure_export')
+    if args.benchmark:
+        module.benchmark_scripts(args.benchmark)
+    elif args.run:
+        raise SystemExit(1 if module.run_scripts(args.run) else 0)
+    else:
+        parser.print_help()
@@ -1,5 +1,11 @@
 import fitz  # 即PyMuPDF
+import hashlib
 import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 def extract_images_from_pdf(pdf_path, output_folder="extracted_pdf_images"):
     """
@@ -58,35 +64,452 @@ def extract_images_from_pdf(pdf_path, output_folder="extracted_pdf_images"):
     doc.close()
     print(f"\n提取完成！共提取 {image_count} 张图片，保存至：{os.path.abspath(output_folder)}")
 
+# ------------------- 图片清单（去重、断点续传） -------------------
+def document_fingerprint(pdf_path, block_size=1 << 20):
+    """PDF 文件内容的 BLAKE2 哈希，文件改动后清单中该文档的记录作废"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImageManifest:
+    """
+    输出文件夹中的 manifest.sqlite：记录每个 (文档, 页码, 序号) 的图片对应哪个文件
+    相同内容（BLAKE2 哈希）的图片只保存一份规范文件，之后的出现位置只在清单里指向它；
+    多个文档共用一个清单时跨文档去重。
+    另记录每个文档（以绝对路径为键）的指纹和已完成的页，重新运行时跳过已完成的文档和页，
+    中断后从断点继续。
+    只由主进程读写。
+    """
+
+    FILENAME = "manifest.sqlite"
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(folder, self.FILENAME))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, file TEXT, size INTEGER);
+            CREATE TABLE IF NOT EXISTS images (
+                document TEXT, page INTEGER, idx INTEGER, xref INTEGER, hash TEXT, file TEXT,
+                PRIMARY KEY (document, page, idx));
+            CREATE TABLE IF NOT EXISTS documents (
+                document TEXT PRIMARY KEY, fingerprint TEXT, folder TEXT, n_pages INTEGER, complete INTEGER);
+            CREATE TABLE IF NOT EXISTS pages (document TEXT, page INTEGER, PRIMARY KEY (document, page));
+            CREATE INDEX IF NOT EXISTS documents_folder ON documents (folder);
+        """)
+
+    def document_state(self, document):
+        """(指纹, 是否完成)，未记录过返回 None"""
+        return self.connection.execute(
+            "SELECT fingerprint, complete FROM documents WHERE document = ?", (document,)).fetchone()
+
+    def start_document(self, document, fingerprint, folder, n_pages):
+        """登记文档；指纹与记录不同（文档已改动）时清除旧的图片和进度记录"""
+        state = self.document_state(document)
+        with self.connection:
+            if state is not None and state[0] != fingerprint:
+                self.forget_document(document)
+            self.connection.execute(
+                "INSERT INTO documents VALUES (?, ?, ?, ?, 0) ON CONFLICT (document) DO UPDATE SET "
+                "fingerprint = excluded.fingerprint, folder = excluded.folder, n_pages = excluded.n_pages",
+                (document, fingerprint, folder, n_pages))
+
+    def rename_document(self, old, new):
+        """文档移动或改名（内容不变）后沿用原来的记录和进度"""
+        with self.connection:
+            for table in ("images", "pages", "documents"):
+                self.connection.execute(f"UPDATE {table} SET document = ? WHERE document = ?", (new, old))
+
+    def forget_document(self, document):
+        """
+        删除文档的记录。它保存的规范文件之后会被覆盖，所以这些内容哈希也一并删除，
+        引用这些文件的其他文档改为未完成，下次运行时重新提取
+        """
+        row = self.connection.execute("SELECT folder FROM documents WHERE document = ?", (document,)).fetchone()
+        own_folder = "" if row is None or row[0] == "." else os.path.normpath(row[0])
+        files = {file for (file,) in self.connection.execute(
+            "SELECT DISTINCT file FROM images WHERE document = ?", (document,))
+            if row is not None and os.path.dirname(file) == own_folder}
+        dependents = set()
+        for file in files:
+            self.connection.execute("DELETE FROM blobs WHERE file = ?", (file,))
+            dependents.update(d for (d,) in self.connection.execute(
+                "SELECT DISTINCT document FROM images WHERE file = ? AND document != ?", (file, document)))
+        for name in {document} | dependents:
+            self.connection.execute("DELETE FROM images WHERE document = ?", (name,))
+            self.connection.execute("DELETE FROM pages WHERE document = ?", (name,))
+        self.connection.execute("DELETE FROM documents WHERE document = ?", (document,))
+        self.connection.executemany("UPDATE documents SET complete = 0 WHERE document = ?",
+                                    [(name,) for name in dependents])
+
+    def done_pages(self, document):
+        """已完成的页码（从 1 计）"""
+        return {page for (page,) in self.connection.execute(
+            "SELECT page FROM pages WHERE document = ?", (document,))}
+
+    def mark_pages(self, document, pages):
+        self.connection.executemany("INSERT OR IGNORE INTO pages VALUES (?, ?)",
+                                    [(document, page) for page in pages])
+
+    def finish_document(self, document):
+        with self.connection:
+            self.connection.execute("UPDATE documents SET complete = 1 WHERE document = ?", (document,))
+
+    def known_hashes(self):
+        return {h for (h,) in self.connection.execute("SELECT hash FROM blobs")}
+
+    def canonical(self, image_hash):
+        """该内容已保存的文件（相对清单文件夹），没有则为 None"""
+        row = self.connection.execute("SELECT file FROM blobs WHERE hash = ?", (image_hash,)).fetchone()
+        return row[0] if row else None
+
+    def add_blob(self, image_hash, file, size):
+        self.connection.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (image_hash, file, size))
+
+    def add_images(self, rows):
+        """rows: [(文档, 页码, 序号, xref, 哈希, 文件)]，页码和序号从 1 计"""
+        self.connection.executemany("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def commit(self):
+        self.connection.commit()
+
+    def images(self, document):
+        """按 (页码, 序号) 排序的 [(页码, 序号, 文件)]，走 images 表的主键索引"""
+        return self.connection.execute(
+            "SELECT page, idx, file FROM images WHERE document = ? ORDER BY page, idx", (document,)).fetchall()
+
+    def document_folder(self, document):
+        """文档保存到的文件夹（相对清单文件夹），未记录过返回 None"""
+        row = self.connection.execute("SELECT folder FROM documents WHERE document = ?", (document,)).fetchone()
+        return row[0] if row else None
+
+    def documents_in(self, folder):
+        """保存到 folder（相对清单文件夹）的文档"""
+        return [document for (document,) in self.connection.execute(
+            "SELECT document FROM documents WHERE folder = ? ORDER BY document", (folder,))]
+
+    def documents(self):
+        """清单中的所有文档"""
+        return [document for (document,) in self.connection.execute(
+            "SELECT document FROM documents ORDER BY document")]
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+# ------------------- 并行流式提取 -------------------
+_worker_doc = None      # 每个子进程各自打开的 fitz 文档
+_worker_hashes = None   # 本进程已知（已保存过）的图片哈希
+
+
+def _init_worker(pdf_path, known_hashes):
+    global _worker_doc, _worker_hashes
+    _worker_doc = fitz.open(pdf_path)
+    _worker_hashes = set(known_hashes)
+
+
+def _image_hash(doc, img_info):
+    """
+    对原始（未解码）图像流加尺寸、位深、色彩空间、滤镜做 BLAKE2 哈希
+    不需要 extract_image 解码，重复的图片在哈希这一步就能跳过
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(img_info[2:6] + img_info[8:9]).encode())
+    digest.update(doc.xref_stream_raw(img_info[0]) or b"")
+    return digest.hexdigest()
+
+
+def _write_file(path, data, slots):
+    try:
+        with open(path, "wb") as f:
+            f.write(data)
+    finally:
+        slots.release()
+
+
+def _extract_images(tasks, n_pages, output_folder, dedupe=True, writers=4, max_pending=64):
+    """
+    子进程：提取 tasks 中的图片 [(页码, 序号, img_info)]（从 0 计）
+    图片字节交给有界写盘线程池，最多 max_pending 张在排队，避免大图占满内存
+    dedupe 时已知哈希的图片不再提取和写盘，文件名为 None
+    返回 (页数, [(页码, 序号, xref, 哈希, 文件名, 字节数)])
+    """
+    slots = threading.BoundedSemaphore(max_pending)
+    records = []
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        futures = []
+        for page_num, img_index, img_info in tasks:
+            xref = img_info[0]
+            image_hash = _image_hash(_worker_doc, img_info) if dedupe else None
+            if dedupe and image_hash in _worker_hashes:
+                records.append((page_num, img_index, xref, image_hash, None, 0))
+                continue
+            base_image = _worker_doc.extract_image(xref)
+            image_bytes = base_image["image"]
+            image_filename = f"page_{page_num+1}_img_{img_index+1}.{base_image['ext']}"
+            slots.acquire()
+            futures.append(pool.submit(_write_file, os.path.join(output_folder, image_filename),
+                                       image_bytes, slots))
+            if dedupe:
+                _worker_hashes.add(image_hash)
+            records.append((page_num, img_index, xref, image_hash, image_filename, len(image_bytes)))
+        for future in futures:
+            future.result()  # 写盘出错时在这里抛出
+    return n_pages, records
+
+
+def _link(target, link_path):
+    """硬链接 link_path → target；已存在则替换"""
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.link(target, link_path)
+
+
+def extract_images_parallel(pdf_path, output_folder="extracted_pdf_images", workers=None,
+                            writers=4, chunk_pages=16, dedupe=True, hardlinks=False, manifest=None,
+                            restart=False):
+    """
+    多进程版 extract_images_from_pdf，文件命名相同（page_N_img_M.ext）
+    页码按 chunk_pages 页一段分给 workers 个进程，每个进程打开自己的 fitz 文档，
+    边提取边交给写盘线程池；每完成一段打印累计的 页/s 和 MB/s
+
+    dedupe=True 时：同一 xref 只在第一次出现的位置提取一次，内容相同（BLAKE2）的图片
+    只保存一份；所有出现位置都记录在 manifest.sqlite 中，指向保存的那份文件。
+    hardlinks=True 时还会在重复出现的位置建立指向该文件的硬链接，保持原来的文件列表。
+
+    每完成一段就把该段的页和图片记入清单：重新运行时内容未变（指纹相同）且已完成的文档直接跳过，
+    未完成的文档只提取剩下的页；restart=True 时忽略已有进度从头提取。
+    :param workers: 进程数，默认 CPU 核数
+    :param writers: 每个进程的写盘线程数
+    :param manifest: 共用的 ImageManifest（多个文档跨文档去重），默认在 output_folder 中新建
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    start = time.perf_counter()
+    own_manifest = manifest is None
+    if own_manifest:
+        manifest = ImageManifest(output_folder)
+    try:
+        return _extract_document(pdf_path, output_folder, manifest, workers, writers, chunk_pages,
+                                 dedupe, hardlinks, restart, start)
+    finally:
+        if own_manifest:
+            manifest.close()
+
+
+def _extract_document(pdf_path, output_folder, manifest, workers, writers, chunk_pages,
+                      dedupe, hardlinks, restart, start):
+    # 以绝对路径为键：不同目录下同名的 PDF 是不同的文档
+    document = os.path.abspath(pdf_path)
+    name = os.path.basename(pdf_path)
+    folder = os.path.relpath(output_folder, manifest.folder)
+    fingerprint = document_fingerprint(pdf_path)
+    for other in manifest.documents_in(folder):
+        if other == document:
+            continue
+        if manifest.document_state(other)[0] == fingerprint:
+            manifest.rename_document(other, document)
+        else:
+            # 文件名 page_N_img_M 不含文档名，两个文档写进同一文件夹会互相覆盖规范文件
+            raise ValueError(f"{output_folder} 中已有 {other} 提取的图片，请为 {document} 换一个输出文件夹")
+    if restart:
+        with manifest.connection:
+            manifest.forget_document(document)
+    state = manifest.document_state(document)
+    if state is not None and state == (fingerprint, 1):
+        print(f"{name} 未改动且已提取完成，跳过")
+        return 0
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        print(f"打开PDF失败：{e}")
+        return 0
+    # 先扫描每页引用了哪些 xref（只读页面资源，不解码图片）
+    occurrences = {}   # xref -> [(页码, 序号), ...]
+    tasks = {}         # 段起始页 -> [(页码, 序号, img_info)]，每个 xref 只在第一次出现时提取
+    n_pages = len(doc)
+    for page_num in range(n_pages):
+        for img_index, img_info in enumerate(doc[page_num].get_images(full=True)):
+            key = img_info[0] if dedupe else (page_num, img_index)
+            if key not in occurrences:
+                tasks.setdefault(page_num - page_num % chunk_pages, []).append((page_num, img_index, img_info))
+            occurrences.setdefault(key, []).append((page_num, img_index))
+    doc.close()
+
+    manifest.start_document(document, fingerprint, folder, n_pages)
+    finished = manifest.done_pages(document)
+    known_hashes = manifest.known_hashes() if dedupe else set()
+    # 只提交还有未完成页的段；段内已完成的页不会有任务（各 xref 第一次出现的页决定它属于哪段）
+    chunks = {}
+    for first in range(0, n_pages, chunk_pages):
+        pages = [page for page in range(first + 1, min(first + chunk_pages, n_pages) + 1) if page not in finished]
+        if pages:
+            chunks[first] = pages
+    n_todo = sum(len(pages) for pages in chunks.values())
+    if finished:
+        print(f"{name}：从断点继续，已完成 {len(finished)}/{n_pages} 页")
+
+    done_pages = image_count = total_bytes = skipped = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(pdf_path, known_hashes)) as pool:
+        futures = {pool.submit(_extract_images, [task for task in tasks.get(first, []) if task[0] + 1 in pages],
+                               len(pages), output_folder, dedupe, writers): pages
+                   for first, pages in chunks.items()}
+        # 按提交顺序合并：同一进程先处理的段先合并，它保存过的哈希（后面段中文件名为 None）
+        # 在合并后面的段时一定已有规范文件
+        for future in futures:
+            pages, records = future.result()
+            done_pages += pages
+            rows = []
+            for page_num, img_index, xref, image_hash, image_filename, n_bytes in records:
+                image_count += image_filename is not None
+                total_bytes += n_bytes
+                written = os.path.normpath(os.path.join(folder, image_filename)) if image_filename else None
+                if not dedupe:
+                    rows.append((document, page_num + 1, img_index + 1, xref, image_hash, written))
+                    continue
+                canonical = manifest.canonical(image_hash)
+                if canonical is None:
+                    manifest.add_blob(image_hash, written, n_bytes)
+                    canonical = written
+                elif written is not None and written != canonical:
+                    # 另一个进程同时保存了相同内容的图片，只保留先登记的那份
+                    os.remove(os.path.join(manifest.folder, written))
+                    image_count -= 1
+                ext = os.path.splitext(canonical)[1]
+                for page, index in occurrences[xref]:
+                    rows.append((document, page + 1, index + 1, xref, image_hash, canonical))
+                    own = os.path.normpath(os.path.join(folder, f"page_{page+1}_img_{index+1}{ext}"))
+                    if own != canonical:
+                        skipped += 1
+                        if hardlinks:
+                            _link(os.path.join(manifest.folder, canonical), os.path.join(manifest.folder, own))
+            # 图片和该段的页在同一个事务中记入清单，中断时最多重做正在处理的段
+            manifest.add_images(rows)
+            manifest.mark_pages(document, futures[future])
+            manifest.commit()
+            elapsed = time.perf_counter() - start
+            print(f"已处理 {done_pages}/{n_todo} 页，{done_pages / elapsed:.1f} 页/s，"
+                  f"{total_bytes / 1024**2 / elapsed:.1f} MB/s")
+    manifest.finish_document(document)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n提取完成！共保存 {image_count} 张图片（{total_bytes / 1024**2:.1f} MB），"
+          f"{skipped} 处重复只记入清单，耗时 {elapsed:.1f} s，保存至：{os.path.abspath(output_folder)}")
+    return image_count
+
+
+def _document_folder(manifest, pdf_path):
+    """
+    文档在清单文件夹中的子文件夹：已登记的文档沿用原来的；否则用文件名，
+    文件名已被另一个仍存在的 PDF 占用时（不同目录下的同名文件）加上绝对路径的短哈希
+    """
+    document = os.path.abspath(pdf_path)
+    folder = manifest.document_folder(document)
+    if folder is not None:
+        return folder
+    folder = os.path.splitext(os.path.basename(pdf_path))[0]
+    # 原文件已不存在的多半是移动或改名，交给 _extract_document 按指纹沿用其记录
+    if any(os.path.exists(other) for other in manifest.documents_in(folder)):
+        folder += "_" + hashlib.blake2b(document.encode(), digest_size=4).hexdigest()
+    return folder
+
+
+def extract_images_into(pdf_paths, output_root="extracted_pdf_images", **kwargs):
+    """
+    提取多个 PDF：每个文档保存到自己的 output_root/<文件名>/（文件名不会互相覆盖），
+    共用 output_root/manifest.sqlite，跨文档相同的图片只保存一次
+    某个文档出错时打印原因，继续处理其余文档；返回出错的文档
+    """
+    manifest = ImageManifest(output_root)
+    failed = []
+    try:
+        for pdf_path in pdf_paths:
+            name = os.path.basename(pdf_path)
+            print(f"\n===== {name} =====")
+            try:
+                extract_images_parallel(pdf_path, os.path.join(output_root, _document_folder(manifest, pdf_path)),
+                                        manifest=manifest, **kwargs)
+            except ValueError as e:
+                print(f"跳过 {name}：{e}")
+                failed.append(pdf_path)
+    finally:
+        manifest.close()
+    return failed
+
+
+def extract_images_from_folder(pdf_folder, output_root="extracted_pdf_images", **kwargs):
+    """批量提取文件夹中的所有 PDF，见 extract_images_into"""
+    return extract_images_into([os.path.join(pdf_folder, name) for name in sorted(os.listdir(pdf_folder))
+                         if name.lower().endswith(".pdf")], output_root, **kwargs)
+
+# ------------------- 按页排序（原 sorting_images_by_page.py） -------------------
+def sorting_images_by_page(img_dir="./extracted_pdf_images"):
+    """
+    img_dir 中的图片按 (页码, 序号) 排序，返回相对 img_dir 的路径
+    有 manifest.sqlite（在 img_dir 或其上一级）时直接按页码、序号查询清单，
+    重复图片返回其规范文件；img_dir 就是清单文件夹时依次列出清单中的所有文档。
+    清单中没有记录时按文件名 page_N_img_M 解析排序
+    """
+    for folder in (img_dir, os.path.dirname(os.path.abspath(img_dir))):
+        if os.path.exists(os.path.join(folder, ImageManifest.FILENAME)):
+            manifest = ImageManifest(folder)
+            try:
+                relative = os.path.relpath(img_dir, folder)
+                documents = manifest.documents() if relative == "." else manifest.documents_in(relative)
+                files = [os.path.relpath(os.path.join(folder, file), img_dir)
+                         for document in documents
+                         for _, _, file in manifest.images(document)]
+            finally:
+                manifest.close()
+            if files:
+                return files
+            break
+
+    pattern = re.compile(r"page_(\d+)_img_(\d+)\.\w+$", re.IGNORECASE)
+
+    def sort_key(fname):
+        m = pattern.search(fname)
+        if m:
+            return (int(m.group(1)), int(m.group(2)), fname)
+        # 不符合命名规则的放到最后，并按文件名排序
+        return (float("inf"), float("inf"), fname)
+
+    return sorted([f for f in os.listdir(img_dir) if not f.startswith(ImageManifest.FILENAME)], key=sort_key)
+
 # ------------------- 调用示例 -------------------
 if __name__ == "__main__":
+    import argparse
+
     # 替换为你的电子版PDF文件路径（相对路径或绝对路径）
     YOUR_PDF_FILE = "Data Visualization in R and Python (Marco Cremonini) (Z-Library).pdf"
-    
+
+    parser = argparse.ArgumentParser(description="提取PDF中的内嵌图片")
+    parser.add_argument("pdf", nargs="?", default=YOUR_PDF_FILE, help="PDF 文件，或包含多个 PDF 的文件夹")
+    parser.add_argument("--output", default="extracted_pdf_images",
+                        help="输出文件夹，每个 PDF 的图片在其中的 <文件名>/ 子文件夹（--serial 除外）")
+    parser.add_argument("--serial", action="store_true", help="逐页串行提取（原始实现）")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数")
+    parser.add_argument("--writers", type=int, default=4, help="每个进程的写盘线程数")
+    parser.add_argument("--no-dedupe", action="store_true", help="不去重，每个出现位置都提取保存")
+    parser.add_argument("--hardlinks", action="store_true", help="重复出现的位置建立硬链接")
+    parser.add_argument("--restart", action="store_true", help="忽略清单中的进度，从头提取")
+    parser.add_argument("--list", action="store_true", help="按页码顺序列出 --output 文件夹中已提取的图片")
+    args = parser.parse_args()
+
     # 调用函数提取图片
-    extract_images_from_pdf(YOUR_PDF_FILE)
-
-
-  # sorting_images_by_page.py
-  import os
-  import json
-  import re
-  
-  img_dir = "./extracted_pdf_images"
-  
-  pattern = re.compile(r"page_(\d+)_img_(\d+)\.png$", re.IGNORECASE)
-  
-  def sort_key(fname: str):
-      m = pattern.search(fname)
-      if m:
-          page = int(m.group(1))
-          idx  = int(m.group(2))
-          return (page, idx)
-      # 不符合命名规则的放到最后，并按文件名排序
-      return (float("inf"), float("inf"), fname)
-  
-  images = sorted(
-      [f for f in os.listdir(img_dir) if f.lower().endswith(".png")],
-      key=sort_key
-  )
-  print(images)
+    options = dict(workers=args.workers, writers=args.writers, dedupe=not args.no_dedupe,
+                   hardlinks=args.hardlinks, restart=args.restart)
+    if args.list:
+        print(sorting_images_by_page(args.output))
+    elif args.serial:
+        extract_images_from_pdf(args.pdf, args.output)
+    elif os.path.isdir(args.pdf):
+        raise SystemExit(1 if extract_images_from_folder(args.pdf, args.output, **options) else 0)
+    else:
+        raise SystemExit(1 if extract_images_into([args.pdf], args.output, **options) else 0)
+
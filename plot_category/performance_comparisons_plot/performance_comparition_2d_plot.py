@@ -4,6 +4,8 @@ from matplotlib.patches import Ellipse
 import numpy as np
 from matplotlib import rcParams
 
+from figure_export import export_figure
+
 # Use serif font to match original
 rcParams['font.family'] = 'serif'
 rcParams['font.serif'] = ['Times New Roman', 'DejaVu Serif', 'serif']
@@ -155,8 +157,6 @@ plt.tight_layout()
 plt.subplots_adjust(bottom=0.18)
 
 # Save the figure
-plt.savefig('/mnt/user-data/outputs/lcb_humaneval_plot.png', dpi=150, bbox_inches='tight', 
-            facecolor='white', edgecolor='none')
-plt.savefig('/mnt/user-data/outputs/lcb_humaneval_plot.pdf', bbox_inches='tight',
-            facecolor='white', edgecolor='none')
+export_figure(plt.gcf(), ['/mnt/user-data/outputs/lcb_humaneval_plot.png', '/mnt/user-data/outputs/lcb_humaneval_plot.pdf'],
+              raster_dpi=150, bbox_inches='tight', facecolor='white', edgecolor='none')
 print("Figure saved successfully!")
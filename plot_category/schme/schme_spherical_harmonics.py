@@ -3,56 +3,143 @@ Spherical Harmonics Visualization - Matching Reference Image Style
 球谐函数可视化 - 匹配参考图片样式
 """
 
+import functools
+import os
+import time
 import numpy as np
-from scipy.special import sph_harm
 import matplotlib.pyplot as plt
 from matplotlib.colors import LightSource
 
-def plot_spherical_harmonic(ax, l, m, resolution=80):
+# 默认输出目录，可通过各函数的 output_dir 参数或命令行 --output-dir 修改
+OUTPUT_DIR = '/mnt/user-data/outputs'
+# 所有图共用的网格分辨率：各图命中同一份 real_harmonic_basis / unit_sphere 缓存
+RESOLUTION = 80
+
+def harmonic_index(l, m):
+    """
+    (l, m) 在 real_harmonic_basis 结果中的下标
+    """
+    return l * l + l + m
+
+
+@functools.lru_cache(maxsize=8)
+def real_harmonic_basis(l_max, resolution):
+    """
+    在共享的 (theta, phi) 网格上一次性计算所有 l <= l_max 的实球谐函数
+
+    使用归一化连带勒让德函数递推 + cos/sin(m*phi)，结果按 (l_max, resolution)
+    缓存。返回 (theta, phi, basis)，theta/phi 与 np.meshgrid(theta, phi) 一致，
+    basis[harmonic_index(l, m)] 与原先 sph_harm 转换得到的 Y_real 相同。
+    """
+    theta_1d = np.linspace(0, np.pi, resolution)
+    phi_1d = np.linspace(0, 2*np.pi, resolution)
+    x = np.cos(theta_1d)
+    s = np.sin(theta_1d)
+    
+    # 归一化连带勒让德函数 P[l, m](theta)，不含 Condon-Shortley 相位
+    P = np.zeros((l_max + 1, l_max + 1, resolution))
+    P[0, 0] = 1 / np.sqrt(4*np.pi)
+    for m in range(1, l_max + 1):
+        P[m, m] = np.sqrt((2*m + 1) / (2*m)) * s * P[m - 1, m - 1]
+    for m in range(l_max):
+        P[m + 1, m] = np.sqrt(2*m + 3) * x * P[m, m]
+        for l in range(m + 2, l_max + 1):
+            a = np.sqrt((4*l*l - 1) / (l*l - m*m))
+            b = np.sqrt(((l - 1)**2 - m*m) / (4*(l - 1)**2 - 1))
+            P[l, m] = a * (x * P[l - 1, m] - b * P[l - 2, m])
+    
+    # 方位角部分，与原先 sph_harm 的实部/虚部约定一致
+    m_all = np.arange(-l_max, l_max + 1)
+    k = np.abs(m_all)[:, None] * phi_1d
+    trig = np.where(m_all[:, None] > 0, np.sqrt(2) * np.cos(k),
+                    np.sqrt(2) * np.sin(k) * np.where(m_all % 2, 1, -1)[:, None])
+    trig[l_max] = 1.0
+    
+    # 网格可分离：Y(phi, theta) = trig(phi) * P(theta)
+    ls = np.repeat(np.arange(l_max + 1), 2*np.arange(l_max + 1) + 1)
+    ms = np.concatenate([np.arange(-l, l + 1) for l in range(l_max + 1)])
+    basis = trig[ms + l_max][:, :, None] * P[ls, np.abs(ms)][:, None, :]
+    
+    theta, phi = np.meshgrid(theta_1d, phi_1d)
+    for array in (theta, phi, basis):
+        array.flags.writeable = False
+    return theta, phi, basis
+
+
+@functools.lru_cache(maxsize=8)
+def unit_sphere(resolution):
+    """
+    单位球面网格的方向余弦 (sinθcosφ, sinθsinφ, cosθ)，按分辨率缓存
+    所有 (l, m) 共享，每个子图只需乘以半径
+    """
+    theta, phi = np.meshgrid(np.linspace(0, np.pi, resolution),
+                             np.linspace(0, 2*np.pi, resolution))
+    sin_theta = np.sin(theta)
+    directions = (sin_theta * np.cos(phi), sin_theta * np.sin(phi), np.cos(theta))
+    for array in directions:
+        array.flags.writeable = False
+    return directions
+
+
+# 所有子图共享的光源和配色：橙红色（正值）和蓝色（负值）- 匹配参考图片配色
+LIGHT_SOURCE = LightSource(azdeg=315, altdeg=45)
+SIGN_COLORS = np.array([[0.90, 0.40, 0.30, 1.0],    # 橙红
+                        [0.30, 0.45, 0.90, 1.0]])   # 蓝色
+
+
+# 3D 坐标范围 [-max_range, max_range] 投影后约占子图边长的比例（box_aspect 1:1:1，默认视距）
+PROJECTED_BOX_FRACTION = 0.58
+
+
+def adaptive_stride(ax, resolution, dpi, radius, max_range, pixels_per_polygon=6):
+    """
+    根据投影后球面在目标 DPI 下的像素尺寸选择 plot_surface 的步长
+    radius 为最大半径 |Y|，max_range 为坐标范围；最大的多边形（半径最大处，
+    边长约 radius * π / (resolution - 1)）在输出图中约占 pixels_per_polygon 像素
+    """
+    bbox = ax.get_position()
+    fig = ax.figure
+    axes_px = min(bbox.width * fig.get_figwidth(),
+                  bbox.height * fig.get_figheight()) * dpi
+    px_per_unit = axes_px * PROJECTED_BOX_FRACTION / (2 * max_range)
+    polygon_px = radius * np.pi / (resolution - 1) * px_per_unit
+    return max(1, int(round(pixels_per_polygon / polygon_px)))
+
+
+def plot_spherical_harmonic(ax, l, m, resolution=RESOLUTION, l_max=None, stride=1, dpi=150):
     """
     在给定的axes上绘制单个球谐函数
+    l_max: 共享批量计算的最大 l（默认为 l），同一图中传入相同值可复用缓存
+    stride: plot_surface 步长；'auto' 时按子图在 dpi 下的像素尺寸自动选择
     """
-    # 创建角度网格
-    theta = np.linspace(0, np.pi, resolution)
-    phi = np.linspace(0, 2*np.pi, resolution)
-    theta, phi = np.meshgrid(theta, phi)
-    
-    # 计算球谐函数
-    Y = sph_harm(m, l, phi, theta)
-    
-    # 转换为实球谐函数
-    if m > 0:
-        Y_real = np.sqrt(2) * (-1)**m * np.real(Y)
-    elif m < 0:
-        Y_real = np.sqrt(2) * (-1)**m * np.imag(Y)
-    else:
-        Y_real = np.real(Y)
+    # 从缓存的批量结果中取出实球谐函数
+    theta, phi, basis = real_harmonic_basis(max(l, l_max or 0), resolution)
+    Y_real = basis[harmonic_index(l, m)]
     
     # 半径 = |Y_real|
     r = np.abs(Y_real)
     
-    # 转换为笛卡尔坐标
-    X = r * np.sin(theta) * np.cos(phi)
-    Y_coord = r * np.sin(theta) * np.sin(phi)
-    Z = r * np.cos(theta)
+    # 转换为笛卡尔坐标（共享的单位球面方向）
+    ux, uy, uz = unit_sphere(resolution)
+    X = r * ux
+    Y_coord = r * uy
+    Z = r * uz
     
-    # 创建颜色数组
-    colors = np.empty(Y_real.shape + (4,))
-    positive = Y_real >= 0
+    # 创建颜色数组：按符号索引共享配色
+    colors = SIGN_COLORS[(Y_real < 0).astype(np.intp)]
     
-    # 橙红色（正值）和蓝色（负值）- 匹配参考图片配色
-    colors[positive] = [0.90, 0.40, 0.30, 1.0]   # 橙红
-    colors[~positive] = [0.30, 0.45, 0.90, 1.0]  # 蓝色
+    # 坐标范围
+    max_range = max(np.max(np.abs(X)), np.max(np.abs(Y_coord)), 
+                   np.max(np.abs(Z)), 0.3) * 1.2
     
     # 绘制3D表面
-    ls = LightSource(azdeg=315, altdeg=45)
+    if stride == 'auto':
+        stride = adaptive_stride(ax, resolution, dpi, np.max(r), max_range)
     ax.plot_surface(X, Y_coord, Z, facecolors=colors,
-                   rstride=1, cstride=1,
-                   antialiased=True, shade=True, lightsource=ls)
+                   rstride=stride, cstride=stride,
+                   antialiased=True, shade=True, lightsource=LIGHT_SOURCE)
     
     # 设置坐标范围
-    max_range = max(np.max(np.abs(X)), np.max(np.abs(Y_coord)), 
-                   np.max(np.abs(Z)), 0.3) * 1.2
     ax.set_xlim([-max_range, max_range])
     ax.set_ylim([-max_range, max_range])
     ax.set_zlim([-max_range, max_range])
@@ -62,9 +149,9 @@ def plot_spherical_harmonic(ax, l, m, resolution=80):
     ax.set_box_aspect([1, 1, 1])
     
 
-def create_grid_visualization():
+def build_grid_figure(resolution=RESOLUTION, stride=1, dpi=150):
     """
-    创建6行x7列的网格图 - 匹配参考图片布局
+    构建6行x11列的网格图（不保存），供 create_grid_visualization 和基准测试使用
     """
     l_max = 5
     n_rows = l_max + 1  # 6行 (l = 0 to 5)
@@ -86,7 +173,7 @@ def create_grid_visualization():
             
             ax = fig.add_subplot(gs[row, col], projection='3d', 
                                facecolor='white')
-            plot_spherical_harmonic(ax, l, m)
+            plot_spherical_harmonic(ax, l, m, resolution, l_max, stride, dpi)
             ax.view_init(elev=20, azim=35)
     
     # 添加标题
@@ -94,15 +181,51 @@ def create_grid_visualization():
                  '$\ell = 0, 1, 2, 3, 4, 5$ (rows)  |  ' +
                  '$m = -\ell, ..., 0, ..., \ell$ (columns)',
                  fontsize=14, y=0.99)
+    return fig
+
+
+def create_grid_visualization(resolution=RESOLUTION, stride=1, output_dir=OUTPUT_DIR):
+    """
+    创建6行x7列的网格图 - 匹配参考图片布局
+    stride: plot_surface 步长，'auto' 按输出 DPI 自适应
+    """
+    build_grid_figure(resolution, stride, dpi=150)
     
-    plt.savefig('/mnt/user-data/outputs/spherical_harmonics_grid.png', 
+    os.makedirs(output_dir, exist_ok=True)
+    plt.savefig(os.path.join(output_dir, 'spherical_harmonics_grid.png'), 
                 dpi=150, bbox_inches='tight', facecolor='white')
     plt.close()
     print("网格版本已保存!")
 
 
-def create_compact_visualization():
+def benchmark_render_modes(resolution=RESOLUTION, dpi=150, repeats=3):
+    """
+    比较 stride=1 与自适应步长下网格图的多边形数量和渲染时间（Agg）
+    计时前先填充 real_harmonic_basis / unit_sphere 缓存，每种步长取 repeats 次中最快的一次
+    """
+    real_harmonic_basis(5, resolution)
+    unit_sphere(resolution)
+    results = {}
+    for stride in (1, 'auto'):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fig = build_grid_figure(resolution, stride, dpi)
+            fig.set_dpi(dpi)
+            fig.canvas.draw()
+            best = min(best, time.perf_counter() - start)
+            n_polygons = sum(len(collection.get_paths())
+                             for ax in fig.axes for collection in ax.collections)
+            plt.close(fig)
+        results[stride] = (best, n_polygons)
+        print(f"stride={stride!s:>4}: {n_polygons:7d} 个多边形, 渲染 {best:.2f} s（{repeats} 次取最快）")
+    
+    return results
+
+
+def create_compact_visualization(resolution=RESOLUTION, stride=1, output_dir=OUTPUT_DIR):
     """
+    stride: plot_surface 步长，'auto' 按输出 DPI 自适应
     创建更紧凑的可视化，类似于上传的参考图片（6x7布局）
     参考图看起来是每行有固定数量的列
     """
@@ -147,18 +270,20 @@ def create_compact_visualization():
             
             ax = fig.add_axes([x_pos, y_pos, plot_width, 0.12], 
                             projection='3d', facecolor='white')
-            plot_spherical_harmonic(ax, l, m, resolution=60)
+            plot_spherical_harmonic(ax, l, m, resolution, l_max, stride)
             ax.view_init(elev=20, azim=35)
             idx += 1
     
-    plt.savefig('/mnt/user-data/outputs/spherical_harmonics_pyramid.png', 
+    os.makedirs(output_dir, exist_ok=True)
+    plt.savefig(os.path.join(output_dir, 'spherical_harmonics_pyramid.png'), 
                 dpi=150, bbox_inches='tight', facecolor='white')
     plt.close()
     print("金字塔版本已保存!")
 
 
-def create_reference_style():
+def create_reference_style(resolution=RESOLUTION, stride=1, output_dir=OUTPUT_DIR):
     """
+    stride: plot_surface 步长，'auto' 按输出 DPI 自适应
     尝试完全匹配参考图片的样式（看起来是规整的6x7网格）
     """
     # 参考图片分析：6行，每行最多7个
@@ -185,24 +310,248 @@ def create_reference_style():
             
             ax = fig.add_subplot(spec[l, col], projection='3d')
             ax.set_facecolor('white')
-            plot_spherical_harmonic(ax, l, m, resolution=70)
+            plot_spherical_harmonic(ax, l, m, resolution, l_max, stride)
             ax.view_init(elev=18, azim=40)
     
-    plt.savefig('/mnt/user-data/outputs/spherical_harmonics_final.png', 
+    os.makedirs(output_dir, exist_ok=True)
+    plt.savefig(os.path.join(output_dir, 'spherical_harmonics_final.png'), 
                 dpi=150, bbox_inches='tight', facecolor='white')
     plt.close()
     print("最终版本已保存!")
 
 
-if __name__ == "__main__":
+# 三种版本相互独立，可在不同进程中渲染
+VARIANTS = {
+    'grid': create_grid_visualization,
+    'pyramid': create_compact_visualization,
+    'final': create_reference_style,
+}
+
+
+def _render_variant(name, output_dir, stride=1):
+    """
+    进程池工作函数：使用 Agg 后端渲染单个版本
+    """
+    import warnings
+    import matplotlib
+    warnings.filterwarnings('ignore')
+    matplotlib.use('Agg')
+    VARIANTS[name](stride=stride, output_dir=output_dir)
+    return name
+
+
+def render_variants(output_dir=OUTPUT_DIR, parallel=True, max_workers=None, stride=1):
+    """
+    渲染全部三种版本；parallel=True 时每个版本在独立进程中渲染
+    stride: plot_surface 步长，'auto' 按输出 DPI 自适应
+    返回总耗时（秒）
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    start = time.perf_counter()
+    if parallel:
+        workers = min(len(VARIANTS), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(_render_variant, VARIANTS, [output_dir] * len(VARIANTS),
+                              [stride] * len(VARIANTS)):
+                pass
+    else:
+        for name in VARIANTS:
+            _render_variant(name, output_dir, stride)
+    return time.perf_counter() - start
+
+
+def benchmark_parallel(output_dir=OUTPUT_DIR):
+    """
+    比较串行与进程池渲染三种版本的总耗时
+    """
+    serial = render_variants(output_dir, parallel=False)
+    parallel = render_variants(output_dir, parallel=True)
+    print(f"串行: {serial:.1f} s, 并行: {parallel:.1f} s, 加速比: {serial / parallel:.2f}x")
+    return serial, parallel
+
+
+def _turntable_figure(l, m, resolution, size_px, dpi):
+    """
+    构建单个球谐函数的正方形图（表面只构建一次，之后每帧只改相机）
+    """
+    fig = plt.figure(figsize=(size_px / dpi, size_px / dpi), dpi=dpi, facecolor='white')
+    ax = fig.add_axes([0, 0, 1, 1], projection='3d', facecolor='white')
+    plot_spherical_harmonic(ax, l, m, resolution, stride='auto', dpi=dpi)
+    return fig, ax
+
+
+def _frame_path(frame_dir, index):
+    return os.path.join(frame_dir, f'frame_{index:05d}.png')
+
+
+def _render_turntable_frames(l, m, frames, frame_dir, elev, resolution, size_px, dpi):
+    """
+    进程池工作函数：渲染一段连续的帧 [(index, azim), ...] 为 PNG 序列
+    """
     import warnings
+    import matplotlib
     warnings.filterwarnings('ignore')
+    matplotlib.use('Agg')
+    
+    fig, ax = _turntable_figure(l, m, resolution, size_px, dpi)
+    for index, azim in frames:
+        ax.view_init(elev=elev, azim=azim)
+        fig.savefig(_frame_path(frame_dir, index), dpi=dpi, facecolor='white')
+    plt.close(fig)
+    return len(frames)
+
+
+def _pipe_turntable_to_ffmpeg(ffmpeg, l, m, azimuths, video_path, elev, resolution,
+                              size_px, dpi, fps):
+    """
+    单进程渲染，将 RGBA 原始帧直接写入 ffmpeg 管道，不落盘
+    ffmpeg 提前退出或返回非零时抛出 RuntimeError，附带其返回码和错误输出
+    """
+    import subprocess
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig, ax = _turntable_figure(l, m, resolution, size_px, dpi)
+    # 交互式后端的画布不一定有 buffer_rgba，固定使用 Agg 画布
+    canvas = FigureCanvasAgg(fig)
+    width, height = canvas.get_width_height()
+    command = [ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}',
+               '-r', str(fps), '-i', '-',
+               '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', video_path]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for azim in azimuths:
+            ax.view_init(elev=elev, azim=azim)
+            canvas.draw()
+            process.stdin.write(canvas.buffer_rgba())
+    except BrokenPipeError:
+        pass  # ffmpeg 已退出，下面报告它的错误
+    finally:
+        plt.close(fig)
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+    stderr = process.stderr.read().decode(errors='replace').strip()
+    process.stderr.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg 失败（返回码 {process.returncode}）：{stderr}")
+
+
+def render_turntable(l, m, output_dir=OUTPUT_DIR, n_frames=360, elev=20, azim_start=35,
+                     resolution=RESOLUTION, size_px=480, dpi=100, workers=None, mp4=False, fps=30):
+    """
+    渲染 Y_l^m 的转台动画：球谐表面只构建一次，每帧只调用 view_init
+    
+    帧按连续区间分给多个工作进程，写为 PNG 序列
+    (output_dir/turntable_l{l}_m{m}/frame_00000.png ...)。mp4=True 且能找到 ffmpeg 时
+    输出 turntable_l{l}_m{m}.mp4：单进程直接通过管道写入原始帧，多进程则编码 PNG 序列。
+    返回每秒帧数。
+    """
+    import shutil
+    from concurrent.futures import ProcessPoolExecutor
+    
+    size_px -= size_px % 2  # yuv420p 需要偶数尺寸
+    azimuths = (azim_start + np.arange(n_frames) * 360 / n_frames).tolist()
+    name = f'turntable_l{l}_m{m}'
+    video_path = os.path.join(output_dir, name + '.mp4')
+    frame_dir = os.path.join(output_dir, name)
+    os.makedirs(frame_dir, exist_ok=True)
+    
+    ffmpeg = shutil.which('ffmpeg')
+    if mp4 and ffmpeg is None:
+        print("未找到 ffmpeg，只输出 PNG 序列")
+    workers = min(n_frames, workers or os.cpu_count() or 1)
+    
+    start = time.perf_counter()
+    if mp4 and ffmpeg and workers == 1:
+        _pipe_turntable_to_ffmpeg(ffmpeg, l, m, azimuths, video_path, elev,
+                                  resolution, size_px, dpi, fps)
+    else:
+        chunks = np.array_split(np.arange(n_frames), workers)
+        jobs = [[(int(i), azimuths[i]) for i in chunk] for chunk in chunks if len(chunk)]
+        if workers == 1:
+            _render_turntable_frames(l, m, jobs[0], frame_dir, elev, resolution, size_px, dpi)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_render_turntable_frames, l, m, job, frame_dir,
+                                       elev, resolution, size_px, dpi) for job in jobs]
+                for future in futures:
+                    future.result()
+        if mp4 and ffmpeg:
+            import subprocess
+            subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-framerate', str(fps),
+                            '-i', os.path.join(frame_dir, 'frame_%05d.png'),
+                            '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', video_path],
+                           check=True)
+    elapsed = time.perf_counter() - start
+    
+    frames_per_second = n_frames / elapsed
+    print(f"Y_{l}^{m} 转台动画: {n_frames} 帧, {elapsed:.1f} s, {frames_per_second:.1f} 帧/秒")
+    return frames_per_second
+
+
+def benchmark_turntable(l=3, m=2, n_frames=24, output_dir=OUTPUT_DIR, **kwargs):
+    """
+    比较每帧重新计算球谐函数并调用 plot_spherical_harmonic 与缓存表面只改相机的帧率
+    基准路径每帧清空 real_harmonic_basis / unit_sphere 的缓存，测到的是真正的逐帧重算
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    size_px, dpi, resolution = 480, 100, RESOLUTION
+    frame_dir = os.path.join(output_dir, 'turntable_benchmark')
+    os.makedirs(frame_dir, exist_ok=True)
+    
+    start = time.perf_counter()
+    for index in range(n_frames):
+        real_harmonic_basis.cache_clear()
+        unit_sphere.cache_clear()
+        fig, ax = _turntable_figure(l, m, resolution, size_px, dpi)
+        ax.view_init(elev=20, azim=35 + index * 360 / n_frames)
+        fig.savefig(_frame_path(frame_dir, index), dpi=dpi, facecolor='white')
+        plt.close(fig)
+    naive = n_frames / (time.perf_counter() - start)
+    print(f"每帧重算并重建: {naive:.1f} 帧/秒")
+    
+    cached = render_turntable(l, m, output_dir, n_frames, resolution=resolution,
+                              size_px=size_px, dpi=dpi, **kwargs)
+    print(f"缓存表面: {cached:.1f} 帧/秒, 提升 {cached / naive:.2f}x")
+    return naive, cached
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="球谐函数可视化")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help="输出目录")
+    parser.add_argument('--serial', action='store_true', help="依次渲染，不使用进程池")
+    parser.add_argument('--benchmark', action='store_true', help="比较串行与并行耗时")
+    parser.add_argument('--stride', type=lambda v: v if v == 'auto' else int(v), default=1,
+                        help="plot_surface 步长（整数），或 auto 按输出 DPI 自适应；越大越快、越粗糙")
+    parser.add_argument('--benchmark-stride', action='store_true',
+                        help="比较 stride=1 与 auto 的多边形数量和渲染时间")
+    parser.add_argument('--turntable', nargs=2, type=int, metavar=('L', 'M'),
+                        help="渲染 Y_L^M 的转台动画，而不是三种静态版本")
+    parser.add_argument('--frames', type=int, default=360, help="转台动画帧数")
+    parser.add_argument('--mp4', action='store_true', help="有 ffmpeg 时输出 MP4")
+    args = parser.parse_args()
     
     print("生成球谐函数可视化...")
     
-    create_grid_visualization()
-    create_compact_visualization() 
-    create_reference_style()
+    if args.turntable:
+        render_turntable(*args.turntable, output_dir=args.output_dir,
+                         n_frames=args.frames, mp4=args.mp4,
+                         workers=1 if args.serial else None)
+    elif args.benchmark:
+        benchmark_parallel(args.output_dir)
+    elif args.benchmark_stride:
+        import matplotlib
+        matplotlib.use('Agg')
+        benchmark_render_modes()
+    else:
+        elapsed = render_variants(args.output_dir, parallel=not args.serial, stride=args.stride)
+        print(f"耗时 {elapsed:.1f} s")
     
     print("\n所有版本已生成完毕！")
     print("=" * 50)